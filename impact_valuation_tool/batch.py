@@ -0,0 +1,339 @@
+"""
+Financial Impact Tool for Lifestyle Coaches - Headless batch scorer
+
+Scores a file of organisation caseloads without starting Streamlit:
+
+    python impact_valuation_tool/batch.py caseloads.csv results.csv --reduction 10
+    python -m impact_valuation_tool.batch caseloads.csv results.csv --reduction 10
+
+The input has one row per organisation: an id column plus one column per health
+condition holding patient counts. Rows are read, scored and written in chunks, so
+memory use does not grow with the size of the input file. With --workers N the
+chunks are scored by a pool of N processes and written back in input order.
+With --reports DIR a TXT, CSV or XLSX report is also written per organisation.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# The app imports its modules as top-level `src` / `utils` packages, also when run with -m
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from src.models import HealthcareCostModel, ImpactTool  # noqa: E402
+from src.scenarios import apply_reduction, scenario_table  # noqa: E402
+from utils.dataset_registry import DEFAULT_METRIC, get_dataset_registry  # noqa: E402
+from utils.reports import REPORT_FORMATS, ReportData, write_report  # noqa: E402
+
+DEFAULT_DATA_PATH = os.path.join(APP_DIR, 'insurance_dataset.xlsx')
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_caseload_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size organisations from a CSV or Parquet file"""
+    if _is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet input requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _chunk_counts(chunk: pd.DataFrame, id_column: str) -> pd.DataFrame:
+    if id_column not in chunk.columns:
+        raise ValueError(f"Id column '{id_column}' not found. Available: {chunk.columns.tolist()}")
+    return chunk.set_index(id_column).fillna(0)
+
+
+def score_chunk(impact_tool: ImpactTool, chunk: pd.DataFrame, id_column: str,
+                reduction_pct: float = None, totals_only: bool = False) -> pd.DataFrame:
+    """Score one chunk of caseloads; long format (organisation x condition) unless totals_only"""
+    result = impact_tool.calculate_batch(_chunk_counts(chunk, id_column))
+
+    if totals_only:
+        scored = pd.DataFrame({
+            'Organisation': result.org_totals.index,
+            'Patient count': result.patient_counts.to_numpy().sum(axis=1),
+            'Total healthcare costs': result.org_totals.to_numpy()
+        })
+        if reduction_pct is not None:
+            _, scenario_costs, savings = apply_reduction(result.patient_counts.to_numpy(), result.costs_per_patient.to_numpy(), reduction_pct)
+            scored['Scenario costs'] = scenario_costs.sum(axis=1)
+            scored['Savings vs base'] = savings.sum(axis=1)
+        return scored
+
+    scored = result.to_long().rename(columns={'Patient_Count': 'Patient count', 'Total societal costs': 'Total healthcare costs'})
+    if np.array_equal(scored['Patient count'], np.floor(scored['Patient count'])):
+        scored['Patient count'] = scored['Patient count'].astype(int)
+    if reduction_pct is not None:
+        reduced, scenario_costs, savings = apply_reduction(scored['Patient count'], scored['Costs per patient'], reduction_pct)
+        scored['Reduced patients'] = reduced.astype(int)
+        scored['Scenario costs'] = scenario_costs
+        scored['Savings vs base'] = savings
+    return scored
+
+
+def render_chunk(scored: pd.DataFrame, output_path: str, first: bool):
+    """Serialize a scored chunk for the output file: CSV text, or the DataFrame itself for Parquet"""
+    if _is_parquet(output_path):
+        return scored
+    return scored.to_csv(index=False, header=first)
+
+
+class _ResultWriter:
+    """Appends rendered chunks to a CSV or Parquet file, stamped with the cost data version.
+
+    CSV output starts with a `# cost data: <version>` comment line; Parquet output
+    carries it as `cost_data_version` in the schema metadata.
+    """
+
+    def __init__(self, path: str, cost_data_version: str):
+        self.path = path
+        self.cost_data_version = cost_data_version
+        self._parquet_writer = None
+        self._csv_file = None
+
+    def write(self, rendered):
+        if isinstance(rendered, str):
+            if self._csv_file is None:
+                self._csv_file = open(self.path, 'w', newline='', encoding='utf-8')
+                self._csv_file.write(f"# cost data: {self.cost_data_version}\n")
+            self._csv_file.write(rendered)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(rendered, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                   b'cost_data_version': self.cost_data_version.encode('utf-8')})
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+# Set once per worker process by _init_worker, so the cost model is pickled once per
+# worker instead of once per chunk
+_worker_tool = None
+
+
+def _init_worker(cost_model: HealthcareCostModel):
+    global _worker_tool
+    _worker_tool = ImpactTool(cost_model)
+
+
+def _score_in_worker(chunk: pd.DataFrame, first: bool, output_path: str, id_column: str, reduction_pct, totals_only: bool):
+    return render_chunk(score_chunk(_worker_tool, chunk, id_column, reduction_pct, totals_only), output_path, first)
+
+
+def _score_parallel(cost_model: HealthcareCostModel, chunks, workers: int, output_path: str, id_column: str,
+                    reduction_pct, totals_only: bool):
+    """Yield (organisations, rendered chunk) in input order while a process pool scores ahead"""
+    max_in_flight = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cost_model,)) as pool:
+        pending = deque()
+        for i, chunk in enumerate(chunks):
+            pending.append((len(chunk), pool.submit(_score_in_worker, chunk, i == 0, output_path, id_column, reduction_pct, totals_only)))
+            if len(pending) >= max_in_flight:
+                size, future = pending.popleft()
+                yield size, future.result()
+        while pending:
+            size, future = pending.popleft()
+            yield size, future.result()
+
+
+def run_batch(input_path: str, output_path: str, data_path: str = DEFAULT_DATA_PATH, id_column: str = 'organisation',
+              reduction_pct: float = None, chunk_size: int = DEFAULT_CHUNK_SIZE, totals_only: bool = False,
+              workers: int = 1, year: int = None, metric: str = DEFAULT_METRIC) -> dict:
+    cost_model = get_dataset_registry(data_path).get_cost_model(year, metric)
+    chunks = iter_caseload_chunks(input_path, chunk_size)
+    if workers > 1:
+        scored_chunks = _score_parallel(cost_model, chunks, workers, output_path, id_column, reduction_pct, totals_only)
+    else:
+        impact_tool = ImpactTool(cost_model)
+        scored_chunks = (
+            (len(chunk), render_chunk(score_chunk(impact_tool, chunk, id_column, reduction_pct, totals_only), output_path, i == 0))
+            for i, chunk in enumerate(chunks)
+        )
+
+    writer = _ResultWriter(output_path, cost_model.version_label)
+    organisations = 0
+    start = time.perf_counter()
+    try:
+        for size, rendered in scored_chunks:
+            writer.write(rendered)
+            organisations += size
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'cost_column': cost_model.COST_COLUMN,
+        'dataset_version': cost_model.version_label,
+        'workers': workers,
+        'organisations': organisations,
+        'seconds': elapsed,
+        'orgs_per_sec': organisations / elapsed if elapsed > 0 else float('inf')
+    }
+
+
+def iter_organisation_reports(impact_tool: ImpactTool, chunk: pd.DataFrame, id_column: str, reduction_pct: float):
+    """Yield (organisation, ReportData) for the organisations of one chunk, one at a time"""
+    result = impact_tool.calculate_batch(_chunk_counts(chunk, id_column))
+    conditions = result.patient_counts.columns.to_numpy(dtype=object)
+    counts = result.patient_counts.to_numpy()
+    costs_per_patient = result.costs_per_patient.to_numpy()
+    total_costs = result.total_costs.to_numpy()
+    for i, organisation in enumerate(result.patient_counts.index):
+        entered = counts[i] > 0
+        patients = counts[i, entered]
+        if np.array_equal(patients, np.floor(patients)):
+            patients = patients.astype(int)
+        results_df = pd.DataFrame({
+            'Condition': conditions[entered],
+            'Patient_Count': patients,
+            'Costs per patient': costs_per_patient[i, entered],
+            'Total societal costs': total_costs[i, entered]
+        })
+        yield organisation, ReportData(int(patients.sum()), float(result.org_totals.iloc[i]), reduction_pct, results_df,
+                                       scenario_table(results_df, reduction_pct), impact_tool.cost_model)
+
+
+def _report_file_name(organisation, extension: str, used: set) -> str:
+    """File name for an organisation's report, made unique within a run with a _2, _3, ... suffix"""
+    stem = re.sub(r'[^\w.-]+', '_', str(organisation)).strip('._') or 'organisation'
+    name = stem
+    suffix = 1
+    # Compared case-insensitively, as on Windows and macOS file systems
+    while name.casefold() in used:
+        suffix += 1
+        name = f"{stem}_{suffix}"
+    used.add(name.casefold())
+    return f"{name}.{extension}"
+
+
+def write_organisation_reports(input_path: str, report_dir: str, report_format: str = 'txt', data_path: str = DEFAULT_DATA_PATH,
+                               id_column: str = 'organisation', reduction_pct: float = 10, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                               year: int = None, metric: str = DEFAULT_METRIC) -> dict:
+    """Write one report per organisation to report_dir, streaming each to its file before building the next.
+
+    Organisation ids are turned into file names; ids that end up with the same name
+    (e.g. 'org 0' and 'org_0') get a numbered suffix instead of overwriting each other.
+    """
+    cost_model = get_dataset_registry(data_path).get_cost_model(year, metric)
+    impact_tool = ImpactTool(cost_model)
+    extension = REPORT_FORMATS[report_format].extension
+    os.makedirs(report_dir, exist_ok=True)
+
+    reports = 0
+    used_names = set()
+    start = time.perf_counter()
+    for chunk in iter_caseload_chunks(input_path, chunk_size):
+        for organisation, data in iter_organisation_reports(impact_tool, chunk, id_column, reduction_pct):
+            file_name = _report_file_name(organisation, extension, used_names)
+            write_report(data, report_format, os.path.join(report_dir, file_name))
+            reports += 1
+    return {'reports': reports, 'seconds': time.perf_counter() - start}
+
+
+def measure_scaling(input_path: str, worker_counts: list, output_suffix: str = '.csv', **batch_kwargs) -> list:
+    """Score the same input with each worker count and report throughput and scaling efficiency.
+
+    Efficiency is throughput per worker relative to the single-worker run (or to the
+    smallest worker count when 1 is not among worker_counts).
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workers in sorted(worker_counts):
+            output_path = os.path.join(tmp_dir, f"scaling_{workers}{output_suffix}")
+            runs.append(run_batch(input_path, output_path, workers=workers, **batch_kwargs))
+
+    baseline = runs[0]['orgs_per_sec'] / runs[0]['workers']
+    for run in runs:
+        run['efficiency'] = run['orgs_per_sec'] / (run['workers'] * baseline)
+    return runs
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score organisation caseloads with the healthcare cost model.")
+    parser.add_argument('input', help="CSV or Parquet file with one row per organisation")
+    parser.add_argument('output', help="CSV or Parquet file to write (format follows the extension; with --scaling only the extension is used)")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="Healthcare cost workbook (default: %(default)s)")
+    parser.add_argument('--year', type=int, default=None, help="Cost data year (default: the latest in the workbook)")
+    parser.add_argument('--metric', default=DEFAULT_METRIC, help="Cost metric: 'per verzekerde', 'per gebruiker' or 'totaal' (default: %(default)s)")
+    parser.add_argument('--id-column', default='organisation', help="Column identifying the organisation (default: %(default)s)")
+    parser.add_argument('--reduction', type=float, default=None, help="Prevalence reduction percentage (1-100) for a scenario")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Organisations per chunk (default: %(default)s)")
+    parser.add_argument('--totals-only', action='store_true', help="Write one row per organisation instead of per condition")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes scoring chunks in parallel (default: %(default)s)")
+    parser.add_argument('--scaling', default=None, metavar='COUNTS',
+                        help="Comma-separated worker counts (e.g. 1,2,4) to benchmark throughput and scaling efficiency instead of writing output once")
+    parser.add_argument('--reports', default=None, metavar='DIR', help="Also write one report per organisation to this directory (requires --reduction)")
+    parser.add_argument('--report-format', default='txt', choices=sorted(REPORT_FORMATS), help="Format of the --reports files (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.reduction is not None and not 0 <= args.reduction <= 100:
+        parser.error("--reduction must be between 0 and 100")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.workers < 1:
+        parser.error("--workers must be positive")
+    if args.reports is not None and args.reduction is None:
+        parser.error("--reports needs a --reduction percentage for the scenario section")
+    if args.reports is not None and args.scaling is not None:
+        parser.error("--reports cannot be combined with --scaling")
+    if args.scaling is not None:
+        try:
+            args.scaling = [int(count) for count in args.scaling.split(',')]
+        except ValueError:
+            parser.error("--scaling must be a comma-separated list of worker counts")
+        if not args.scaling or min(args.scaling) < 1:
+            parser.error("--scaling worker counts must be positive")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    batch_kwargs = dict(data_path=args.data, year=args.year, metric=args.metric, id_column=args.id_column, reduction_pct=args.reduction,
+                        chunk_size=args.chunk_size, totals_only=args.totals_only)
+
+    if args.scaling:
+        runs = measure_scaling(args.input, args.scaling, os.path.splitext(args.output)[1] or '.csv', **batch_kwargs)
+        print(f"{'workers':>7}  {'seconds':>8}  {'orgs/sec':>12}  {'efficiency':>10}", file=sys.stderr)
+        for run in runs:
+            print(f"{run['workers']:>7}  {run['seconds']:>8.2f}  {run['orgs_per_sec']:>12,.0f}  {run['efficiency']:>10.0%}", file=sys.stderr)
+        return
+
+    stats = run_batch(args.input, args.output, workers=args.workers, **batch_kwargs)
+    print(f"Scored {stats['organisations']} organisations with '{stats['cost_column']}' of {stats['dataset_version']} in {stats['seconds']:.2f}s with {stats['workers']} worker(s) "
+          f"({stats['orgs_per_sec']:,.0f} orgs/sec) -> {args.output}", file=sys.stderr)
+
+    if args.reports:
+        report_stats = write_organisation_reports(args.input, args.reports, args.report_format, data_path=args.data, year=args.year,
+                                                  metric=args.metric, id_column=args.id_column, reduction_pct=args.reduction,
+                                                  chunk_size=args.chunk_size)
+        print(f"Wrote {report_stats['reports']} {args.report_format.upper()} reports in {report_stats['seconds']:.2f}s -> {args.reports}",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: streaming, column-pruned workbook ingestion vs. the pandas loader
+
+Writes synthetic `niveau2` workbooks with the columns of the real export and times
+both ingestion paths on them:
+
+    python impact_valuation_tool/benchmarks/bench_ingestion.py --rows 10000,100000,1000000
+
+- pandas: pd.read_excel of the whole sheet, then every cost column through
+  astype(str) / pd.to_numeric (the loader before the streaming reader)
+- streaming: read_cost_columns (openpyxl read-only, `codenaam` and cost columns only)
+
+A share of the cost cells is written as Dutch decimal-comma text ('1.234,56'); the
+'unparsed' column counts the cells the pandas loader turned into 0.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_loader import COST_SHEET, find_cost_columns, read_cost_columns  # noqa: E402
+
+HEADER = ['RUBRIEK', 'rubrieknaam', 'CATEGORIE', 'codenaam', 'EENHEID'] + [
+    f"kosten {metric} {year}" for year in (2022, 2023, 2024) for metric in ('per verzekerde', 'per gebruiker', 'totaal')
+]
+
+
+def _dutch(value: float) -> str:
+    return f"{value:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.')
+
+
+def write_workbook(path: str, n_rows: int, dutch_share: float = 0.1, seed: int = 0):
+    """Synthetic cost sheet with n_rows services"""
+    import openpyxl
+    rng = np.random.default_rng(seed)
+    costs = np.round(rng.lognormal(4, 1.5, (n_rows, 9)), 2)
+    as_text = rng.random((n_rows, 9)) < dutch_share
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(COST_SHEET)
+    sheet.append(HEADER)
+    for i in range(n_rows):
+        row = [float(i // 100), f"Rubriek {i // 100}", str(500 + i % 100), f"Service {i}", "Euro's"]
+        row += [_dutch(cost) if text else float(cost) for cost, text in zip(costs[i], as_text[i])]
+        sheet.append(row)
+    workbook.save(path)
+
+
+def load_with_pandas(path: str) -> pd.DataFrame:
+    df = pd.read_excel(path, COST_SHEET)
+    for col in find_cost_columns(df.columns).values():
+        df[col] = pd.to_numeric(df[col].astype(str), errors='coerce').fillna(0.0)
+    return df
+
+
+def load_streaming(path: str) -> pd.DataFrame:
+    df = read_cost_columns(path)
+    cost_columns = list(find_cost_columns(df.columns).values())
+    df[cost_columns] = df[cost_columns].fillna(0.0)
+    return df
+
+
+def run(rows: list, dutch_share: float = 0.1, seed: int = 0) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in rows:
+            path = os.path.join(tmp_dir, f"costs_{n_rows}.xlsx")
+            write_workbook(path, n_rows, dutch_share, seed)
+
+            start = time.perf_counter()
+            pandas_df = load_with_pandas(path)
+            pandas_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            streaming_df = load_streaming(path)
+            streaming_seconds = time.perf_counter() - start
+
+            cost_columns = list(find_cost_columns(streaming_df.columns).values())
+            streamed = streaming_df[cost_columns].to_numpy()
+            parsed_by_pandas = pandas_df[cost_columns].to_numpy()
+            results.append({
+                'rows': n_rows,
+                'file_mb': os.path.getsize(path) / 1e6,
+                'pandas_seconds': pandas_seconds,
+                'streaming_seconds': streaming_seconds,
+                'speedup': pandas_seconds / streaming_seconds,
+                'unparsed_by_pandas': int(np.sum((parsed_by_pandas == 0) & (streamed != 0))),
+                'mismatches': int(np.sum((parsed_by_pandas != streamed) & (parsed_by_pandas != 0))),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark workbook ingestion on synthetic cost sheets.")
+    parser.add_argument('--rows', default='10000,100000,1000000', help="Comma-separated row counts (default: %(default)s)")
+    parser.add_argument('--dutch-share', type=float, default=0.1, help="Share of cost cells written as decimal-comma text (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run([int(n) for n in args.rows.split(',')], args.dutch_share, args.seed)
+    print(f"{'rows':>9}  {'MB':>6}  {'pandas s':>9}  {'stream s':>9}  {'speedup':>7}  {'unparsed':>9}  {'mismatch':>8}")
+    for r in results:
+        print(f"{r['rows']:>9,}  {r['file_mb']:>6.1f}  {r['pandas_seconds']:>9.2f}  {r['streaming_seconds']:>9.2f}  "
+              f"{r['speedup']:>6.1f}x  {r['unparsed_by_pandas']:>9,}  {r['mismatches']:>8,}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark suite for the calculation and rendering pipeline
+
+Times every stage from loading the workbook to building the report on synthetic
+inputs of 1-100k organisations and 20-2,000 conditions, and stores the results as
+JSON so runs on different commits can be compared:
+
+    python impact_valuation_tool/benchmarks/bench_pipeline.py --json before.json
+    python impact_valuation_tool/benchmarks/bench_pipeline.py --json after.json --compare before.json
+
+Each case reports the best and median of --repeat runs. Organisation x condition
+cases above --max-cells matrix cells are skipped to bound memory use.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.condition_mapping import ConditionMapping  # noqa: E402
+from src.models import DEFAULT_COST_COLUMN, HealthcareCostModel, ImpactTool  # noqa: E402
+from src.scenarios import apply_reduction, scenario_table  # noqa: E402
+from utils.charts import build_scatter_figure  # noqa: E402
+from utils.data_loader import load_and_prepare_healthcare_data  # noqa: E402
+from utils.reports import ReportData, render_report  # noqa: E402
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'insurance_dataset.xlsx')
+ORGANISATIONS = [1, 100, 10_000, 100_000]
+CONDITIONS = [20, 200, 2_000]
+
+
+class SyntheticCostModel(HealthcareCostModel):
+    """Cost model that maps n_conditions generated conditions onto random services of the cost table"""
+
+    def __init__(self, df_healthcare_costs: pd.DataFrame, n_conditions: int, services_per_condition: int = 8, seed: int = 0):
+        self._n_conditions = n_conditions
+        self._services_per_condition = services_per_condition
+        self._seed = seed
+        super().__init__(df_healthcare_costs)
+
+    def _create_condition_mapping(self) -> ConditionMapping:
+        rng = np.random.default_rng(self._seed)
+        services = self.df_costs.index.tolist()
+        return ConditionMapping.from_dict({
+            f"Condition {i + 1}": rng.choice(services, self._services_per_condition, replace=False).tolist()
+            for i in range(self._n_conditions)
+        })
+
+
+def synthetic_costs(n_services: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'codenaam': [f"Service {j + 1}" for j in range(n_services)],
+        DEFAULT_COST_COLUMN: np.round(rng.lognormal(4, 1.5, n_services), 1),
+    })
+
+
+def synthetic_counts(n_organisations: int, conditions: list, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 50, (n_organisations, len(conditions)))
+    return pd.DataFrame(counts, columns=conditions, index=[f"org{i}" for i in range(n_organisations)])
+
+
+def measure(func, repeat: int) -> tuple:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.median(times))
+
+
+def _case(name: str, func, repeat: int, organisations=None, conditions=None) -> dict:
+    best, median = measure(func, repeat)
+    return {'name': name, 'organisations': organisations, 'conditions': conditions,
+            'best_seconds': best, 'median_seconds': median, 'repeat': repeat}
+
+
+def run_suite(organisation_scales=ORGANISATIONS, condition_scales=CONDITIONS, repeat: int = 3,
+              max_cells: int = 20_000_000, log=None) -> list:
+    results = []
+
+    def add(result):
+        results.append(result)
+        if log:
+            log(result)
+
+    # Loading: a cold read (no snapshot sidecar yet) and a warm one
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def load_cold():
+            path = os.path.join(tmp_dir, f"cold_{time.perf_counter_ns()}.xlsx")
+            shutil.copyfile(DATA_PATH, path)
+            load_and_prepare_healthcare_data(path)
+
+        warm_path = os.path.join(tmp_dir, 'warm.xlsx')
+        shutil.copyfile(DATA_PATH, warm_path)
+        load_and_prepare_healthcare_data(warm_path)
+        add(_case('load_and_prepare_healthcare_data (cold)', load_cold, repeat))
+        add(_case('load_and_prepare_healthcare_data (warm)', lambda: load_and_prepare_healthcare_data(warm_path), repeat))
+
+    for n_conditions in condition_scales:
+        costs_df = synthetic_costs(max(54, n_conditions // 2))
+        add(_case('HealthcareCostModel construction', lambda: SyntheticCostModel(costs_df, n_conditions), repeat,
+                  conditions=n_conditions))
+        cost_model = SyntheticCostModel(costs_df, n_conditions)
+        conditions = list(cost_model.conditions)
+        add(_case('get_cost_per_condition (all conditions)',
+                  lambda: [cost_model.get_cost_per_condition(condition) for condition in conditions], repeat,
+                  conditions=n_conditions))
+
+        # Single organisation: the interactive app path
+        impact_tool = ImpactTool(cost_model)
+        impact_tool.patients_per_condition = synthetic_counts(1, conditions).iloc[0].to_dict()
+        add(_case('ImpactTool.calculate_impact', impact_tool.calculate_impact, repeat, 1, n_conditions))
+        results_df = impact_tool.results_df
+        add(_case('scenario_table', lambda: scenario_table(results_df, 10), repeat, 1, n_conditions))
+        scenario_df = scenario_table(results_df, 10)
+        chart_df = results_df.rename(columns={'Patient_Count': 'Patient count', 'Total societal costs': 'Total healthcare costs'})
+        add(_case('scatter figure', lambda: build_scatter_figure(chart_df), repeat, 1, n_conditions))
+        report_data = ReportData(int(results_df['Patient_Count'].sum()), impact_tool.total_societal_cost, 10, results_df, scenario_df,
+                                 cost_model)
+        add(_case('TXT report', lambda: render_report(report_data, 'txt'), repeat, 1, n_conditions))
+        add(_case('XLSX report', lambda: render_report(report_data, 'xlsx'), repeat, 1, n_conditions))
+
+        # Many organisations: the batch path
+        for n_organisations in organisation_scales:
+            if n_organisations * n_conditions > max_cells:
+                continue
+            counts = synthetic_counts(n_organisations, conditions)
+            add(_case('ImpactTool.calculate_batch', lambda: impact_tool.calculate_batch(counts), repeat,
+                      n_organisations, n_conditions))
+            batch = impact_tool.calculate_batch(counts)
+            count_matrix = batch.patient_counts.to_numpy()
+            cost_matrix = batch.costs_per_patient.to_numpy()
+            add(_case('apply_reduction (batch scenario)', lambda: apply_reduction(count_matrix, cost_matrix, 10), repeat,
+                      n_organisations, n_conditions))
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: dict) -> tuple:
+    return result['name'], result['organisations'], result['conditions']
+
+
+def _scale(result: dict) -> str:
+    parts = []
+    if result['organisations'] is not None:
+        parts.append(f"{result['organisations']:,} orgs")
+    if result['conditions'] is not None:
+        parts.append(f"{result['conditions']:,} cond")
+    return ' x '.join(parts) or '-'
+
+
+def compare(results: list, baseline: list, threshold: float = 1.2) -> list:
+    """(result, baseline best seconds, ratio, flag) for every case present in both runs.
+
+    flag is 'SLOWER' above `threshold`, 'faster' below 1 / `threshold` and '' otherwise.
+    """
+    previous = {_key(result): result['best_seconds'] for result in baseline}
+    rows = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before:
+            ratio = result['best_seconds'] / before
+            flag = 'SLOWER' if ratio > threshold else ('faster' if ratio < 1 / threshold else '')
+            rows.append((result, before, ratio, flag))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calculation and rendering pipeline.")
+    parser.add_argument('--organisations', default=','.join(map(str, ORGANISATIONS)), help="Comma-separated organisation counts (default: %(default)s)")
+    parser.add_argument('--conditions', default=','.join(map(str, CONDITIONS)), help="Comma-separated condition counts (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the best and median are reported (default: %(default)s)")
+    parser.add_argument('--max-cells', type=int, default=20_000_000, help="Skip batch cases with more organisation x condition cells (default: %(default)s)")
+    parser.add_argument('--json', default=None, metavar='PATH', help="Write the results as JSON")
+    parser.add_argument('--compare', default=None, metavar='PATH', help="JSON of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="Ratio above which a case is flagged as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    def log(result):
+        print(f"{result['name']:<42} {_scale(result):>24}  {result['best_seconds'] * 1000:>10.2f} ms", file=sys.stderr)
+
+    results = run_suite([int(n) for n in args.organisations.split(',')], [int(n) for n in args.conditions.split(',')],
+                        args.repeat, args.max_cells, log)
+
+    if args.json:
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+        regressions = 0
+        for result, before, ratio, flag in compare(results, baseline['results'], args.threshold):
+            regressions += flag == 'SLOWER'
+            print(f"{result['name']:<42} {_scale(result):>24}  {before * 1000:>10.2f} -> {result['best_seconds'] * 1000:>10.2f} ms  {ratio:>5.2f}x  {flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: cold start and rerun cost of the Streamlit app
+
+Each run starts a fresh Python process that
+- imports the libraries and then app.py (module import only, main() does not run),
+- renders the app once with Streamlit's AppTest (the first render of a new server,
+  including loading the cost data), and
+- reruns it --reruns times, as happens on every widget interaction.
+
+The app runs with ?profile=1, so the per-stage timings of utils/profiling.py are
+reported too; 'Page setup' and 'Header' are the presentation layer (page config, CSS, header).
+
+    python impact_valuation_tool/benchmarks/bench_startup.py --runs 3 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIBRARIES = ['pandas', 'numpy', 'plotly.express', 'streamlit']
+
+
+def _child(reruns: int) -> dict:
+    """One cold start; runs in its own process"""
+    import importlib
+    result = {'import_seconds': {}}
+    for module in LIBRARIES + ['app']:
+        start = time.perf_counter()
+        importlib.import_module(module)
+        result['import_seconds'][module] = time.perf_counter() - start
+
+    from streamlit.testing.v1 import AppTest
+    from utils.styling import THEMES, _build_header_html, _build_page_css, get_header_html, get_page_css
+
+    # The app opens its workbook relative to the repository root
+    os.chdir(os.path.dirname(APP_DIR))
+    app_test = AppTest.from_file(os.path.join(APP_DIR, 'app.py'), default_timeout=120)
+    app_test.query_params['profile'] = '1'
+    start = time.perf_counter()
+    app_test.run()
+    result['first_render_seconds'] = time.perf_counter() - start
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].value)
+
+    rerun_seconds = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app_test.run()
+        rerun_seconds.append(time.perf_counter() - start)
+    result['rerun_seconds'] = rerun_seconds
+
+    stages = app_test.session_state.app_state.profiler.stage_table()
+    result['first_render_stages_ms'] = stages[0]
+    result['rerun_stages_ms'] = {
+        stage: statistics.median(row.get(stage, 0.0) for row in stages[1:])
+        for stage in stages[-1]
+    } if len(stages) > 1 else {}
+
+    # Presentation markup: assembling it (what every rerun used to do) vs. the lookup of the precomputed strings
+    n = 1000
+    start = time.perf_counter()
+    for _ in range(n):
+        for theme in THEMES:
+            _build_page_css(theme)
+            _build_header_html(theme)
+    result['markup_build_us'] = (time.perf_counter() - start) / (n * len(THEMES)) * 1e6
+    start = time.perf_counter()
+    for _ in range(n):
+        for theme in THEMES:
+            get_page_css(theme)
+            get_header_html(theme, 2024)
+    result['markup_lookup_us'] = (time.perf_counter() - start) / (n * len(THEMES)) * 1e6
+    return result
+
+
+def run(runs: int = 3, reruns: int = 5) -> list:
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--reruns', str(reruns)],
+                                   capture_output=True, text=True, cwd=APP_DIR, check=True)
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark import time, first render and reruns of the Streamlit app.")
+    parser.add_argument('--runs', type=int, default=3, help="Cold starts, each in a fresh process (default: %(default)s)")
+    parser.add_argument('--reruns', type=int, default=5, help="Reruns after each first render (default: %(default)s)")
+    parser.add_argument('--json', default=None, metavar='PATH', help="Also write the results as JSON")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.path.insert(0, APP_DIR)
+        print(json.dumps(_child(args.reruns)))
+        return
+
+    results = run(args.runs, args.reruns)
+    print(f"{'import':<22} {'median ms':>10}")
+    for module in LIBRARIES + ['app']:
+        print(f"{module:<22} {statistics.median(r['import_seconds'][module] for r in results) * 1000:>10.1f}")
+    print(f"\n{'first render':<22} {statistics.median(r['first_render_seconds'] for r in results) * 1000:>10.1f}")
+    print(f"{'rerun':<22} {statistics.median(s for r in results for s in r['rerun_seconds']) * 1000:>10.1f}")
+    print(f"\n{'stage':<22} {'first ms':>10} {'rerun ms':>10}")
+    for stage in results[0]['first_render_stages_ms']:
+        first = statistics.median(r['first_render_stages_ms'].get(stage, 0.0) for r in results)
+        rerun = statistics.median(r['rerun_stages_ms'].get(stage, 0.0) for r in results)
+        print(f"{stage:<22} {first:>10.2f} {rerun:>10.2f}")
+    print(f"\nmarkup per theme: assembled {statistics.median(r['markup_build_us'] for r in results):.1f} µs, "
+          f"precomputed {statistics.median(r['markup_lookup_us'] for r in results):.2f} µs")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
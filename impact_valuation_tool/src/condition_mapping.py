@@ -0,0 +1,139 @@
+"""
+Versioned condition -> healthcare service mapping, loaded from a CSV data file
+"""
+import csv
+import os
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+from src.service_index import MATCH_EXACT, ServiceIndex, build_miss_report
+
+DEFAULT_MAPPING_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'condition_mapping.csv')
+MAPPING_COLUMNS = ['category', 'condition', 'service']
+
+
+class ConditionMapping:
+    """Conditions grouped in categories, each mapped to the healthcare services (`codenaam`) it uses.
+
+    Built from (category, condition, service) rows: a condition keeps its services in
+    row order, and a service listed twice counts twice. The rows are also compiled into
+    integer (condition id, service id) pairs, so a cost model builds its incidence
+    matrix in one vectorized step however many conditions there are.
+    """
+
+    def __init__(self, rows, version: str = None, source: str = None):
+        services_by_condition = {}
+        categories = {}
+        category_of = {}
+        for category, condition, service in rows:
+            if not condition or not service:
+                raise ValueError(f"Condition mapping row ({category!r}, {condition!r}, {service!r}) needs a condition and a service")
+            if category_of.setdefault(condition, category) != category:
+                raise ValueError(f"Condition '{condition}' is listed under both '{category_of[condition]}' and '{category}'")
+            if condition not in services_by_condition:
+                services_by_condition[condition] = []
+                categories.setdefault(category, []).append(condition)
+            services_by_condition[condition].append(service)
+
+        self.version = version
+        self.source = source
+        self._services_by_condition = {condition: tuple(services) for condition, services in services_by_condition.items()}
+        self._categories = {category: tuple(conditions) for category, conditions in categories.items()}
+        self.conditions = tuple(self._services_by_condition)
+        self.services = tuple(dict.fromkeys(
+            service for services in self._services_by_condition.values() for service in services
+        ))
+
+        service_ids = {service: j for j, service in enumerate(self.services)}
+        pairs = [(i, service_ids[service]) for i, services in enumerate(self._services_by_condition.values()) for service in services]
+        pair_ids = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        self.pair_condition_ids = pair_ids[:, 0].copy()
+        self.pair_service_ids = pair_ids[:, 1].copy()
+        self.pair_condition_ids.setflags(write=False)
+        self.pair_service_ids.setflags(write=False)
+
+    @classmethod
+    def from_dict(cls, services_by_condition: dict, categories: dict = None, version: str = None) -> 'ConditionMapping':
+        """Mapping from {condition: [services]}; conditions missing from `categories` go under 'Other'"""
+        category_of = {condition: category for category, conditions in (categories or {}).items() for condition in conditions}
+        return cls(
+            ((category_of.get(condition, 'Other'), condition, service)
+             for condition, services in services_by_condition.items() for service in services),
+            version=version
+        )
+
+    @property
+    def services_by_condition(self) -> MappingProxyType:
+        return MappingProxyType(self._services_by_condition)
+
+    @property
+    def categories(self) -> MappingProxyType:
+        """{category: conditions} in file order"""
+        return MappingProxyType(self._categories)
+
+    def conditions_using(self, service: str) -> list:
+        return [condition for condition, services in self._services_by_condition.items() if service in services]
+
+    def resolve_services(self, service_index: ServiceIndex) -> tuple:
+        """(matches, miss report) of the mapped services in a cost sheet's ServiceIndex.
+
+        Names that only differ in case, accents, spacing or 't/m' spelling resolve to the
+        sheet's name and are listed in the report; raises ValueError with the report when
+        a service is missing or ambiguous.
+        """
+        matches = service_index.resolve_all(self.services)
+        used_by = {match.requested: self.conditions_using(match.requested) for match in matches if match.kind != MATCH_EXACT}
+        name = f"condition mapping {self.version}" if self.version else "condition mapping"
+        report = build_miss_report(matches, used_by, label=f"of {name} ({self.source or 'in memory'}) ")
+        unresolved = [match for match in matches if match.resolved is None]
+        if unresolved:
+            raise ValueError(f"{len(unresolved)} mapped service(s) could not be resolved. {report}")
+        return matches, report
+
+
+def read_condition_mapping(path: str) -> ConditionMapping:
+    """Parse a mapping CSV: `# version: <v>` comment line(s), then a category,condition,service header and rows"""
+    version = None
+    with open(path, newline='', encoding='utf-8') as f:
+        lines = []
+        for line in f:
+            if line.startswith('#'):
+                key, _, value = line[1:].partition(':')
+                if key.strip().lower() == 'version':
+                    version = value.strip()
+            elif line.strip():
+                lines.append(line)
+
+    reader = csv.reader(lines)
+    header = [column.strip() for column in next(reader, [])]
+    if header != MAPPING_COLUMNS:
+        raise ValueError(f"Condition mapping '{path}' must have the columns {MAPPING_COLUMNS}, found {header}")
+    rows = []
+    for number, row in enumerate(reader, start=1):
+        if len(row) != len(MAPPING_COLUMNS):
+            raise ValueError(f"Condition mapping '{path}', data row {number}: expected {len(MAPPING_COLUMNS)} values, got {row}")
+        rows.append(tuple(value.strip() for value in row))
+    return ConditionMapping(rows, version=version, source=os.path.realpath(path))
+
+
+# Parsed mappings per path, reused until the file changes
+_mappings = {}
+_mappings_lock = threading.Lock()
+
+
+def load_condition_mapping(path: str = DEFAULT_MAPPING_PATH) -> ConditionMapping:
+    """Parsed (and compiled) mapping, cached per path and re-read when the file's mtime or size changes"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Condition mapping file '{path}' not found.")
+    stat = os.stat(path)
+    key = os.path.realpath(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    with _mappings_lock:
+        cached = _mappings.get(key)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+        mapping = read_condition_mapping(path)
+        _mappings[key] = (stat_key, mapping)
+        return mapping
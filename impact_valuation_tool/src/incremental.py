@@ -0,0 +1,104 @@
+"""
+Incremental impact calculation with input change tracking
+"""
+import pandas as pd
+
+from src.models import HealthcareCostModel
+from utils.profiling import timed
+
+RESULT_COLUMNS = ['Condition', 'Patient_Count', 'Costs per patient', 'Total societal costs']
+
+
+def duplicate_custom_names(conditions, custom_names) -> set:
+    """Positions of the custom condition names (ignoring case and surrounding spaces) already used by a
+    predefined condition or an earlier custom one; results are keyed by condition name, so these are left out"""
+    taken = {condition.casefold() for condition in conditions}
+    duplicates = set()
+    for idx, name in enumerate(custom_names):
+        key = (name or "").strip().casefold()
+        if not key:
+            continue
+        if key in taken:
+            duplicates.add(idx)
+        taken.add(key)
+    return duplicates
+
+
+class IncrementalCalculator:
+    """Keeps the last results and only recomputes rows whose inputs changed.
+
+    Rows are keyed by condition name for the predefined conditions and by position
+    for custom conditions. A row's inputs are its name, patient count and cost per
+    patient (custom cost, or the model default); the result row of every key whose
+    inputs did not change is reused. The total is kept as a left-to-right running
+    sum per row, the same order as ImpactTool, and only re-summed from the first
+    changed row on, so it matches a full recalculation exactly. When no row changed,
+    the results table is kept as is.
+    """
+
+    def __init__(self, cost_model: HealthcareCostModel):
+        self.cost_model = cost_model
+        self._inputs = {}
+        self._rows = {}
+        self._order = []
+        self._running_totals = []
+        self.results_df = pd.DataFrame(columns=RESULT_COLUMNS)
+        self.total_cost = 0.0
+
+    @timed('IncrementalCalculator.update')
+    def update(self, patients_per_condition: dict, custom_costs: dict = None, custom_conditions: list = None) -> set:
+        """Bring the results up to date; returns the keys of the rows that were (re)computed or removed.
+
+        `custom_conditions` holds (name, patients, cost) per custom condition; those
+        named like a predefined or earlier custom condition are skipped.
+        """
+        custom_costs = custom_costs or {}
+        inputs = {}
+        for condition, count in patients_per_condition.items():
+            if count > 0:
+                cost = custom_costs.get(condition)
+                if cost is None:
+                    cost = self.cost_model.get_cost_per_condition(condition)
+                inputs[condition] = (condition, count, cost)
+
+        custom_conditions = custom_conditions or []
+        duplicates = duplicate_custom_names(self.cost_model.conditions, [name for name, _, _ in custom_conditions])
+        for idx, (name, patients, cost) in enumerate(custom_conditions):
+            if idx in duplicates:
+                continue
+            name = (name or "").strip()
+            try:
+                patients = int(patients)
+                cost = float(cost)
+            except (TypeError, ValueError):
+                continue
+            if name and patients > 0 and cost > 0:
+                inputs[('custom', idx)] = (name, patients, cost)
+
+        changed = {key for key, row_inputs in inputs.items() if self._inputs.get(key) != row_inputs}
+        removed = set(self._inputs) - set(inputs)
+        order = list(inputs)
+        if not (changed or removed or order != self._order):
+            return set()
+
+        for key in changed:
+            name, count, cost = inputs[key]
+            self._rows[key] = (name, count, cost, count * cost)
+        for key in removed:
+            del self._rows[key]
+
+        # Running totals up to the first changed or moved row still hold
+        first = next((k for k, key in enumerate(order)
+                      if k >= len(self._order) or self._order[k] != key or key in changed), len(order))
+        running_totals = self._running_totals[:first]
+        total_cost = running_totals[-1] if running_totals else 0.0
+        for key in order[first:]:
+            total_cost += self._rows[key][3]
+            running_totals.append(total_cost)
+
+        self._inputs = inputs
+        self._order = order
+        self._running_totals = running_totals
+        self.total_cost = total_cost
+        self.results_df = pd.DataFrame([self._rows[key] for key in order], columns=RESULT_COLUMNS)
+        return changed | removed
@@ -1,120 +1,263 @@
 """
 Healthcare Cost Model and Impact Tool Classes
 """
+import threading
+from types import MappingProxyType
+
+import numpy as np
 import pandas as pd
 
+from src.condition_mapping import ConditionMapping, load_condition_mapping
+from src.service_index import ServiceIndex
+from utils.profiling import timed
+
+SERVICE_FOUND = 'found'
+SERVICE_NOT_FOUND = 'not found'
+SERVICE_ERROR = 'error'
+SERVICE_INVALID = 'invalid type'
+SERVICE_STATUSES = [SERVICE_FOUND, SERVICE_NOT_FOUND, SERVICE_ERROR, SERVICE_INVALID]
+
+DEFAULT_COST_COLUMN = 'kosten per verzekerde 2024'
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
 
 class HealthcareCostModel:
-    """Manages healthcare costs and condition mappings"""
+    """Manages healthcare costs and condition mappings.
+
+    The condition -> service mapping (by default the condition_mapping.csv data file)
+    is resolved against the cost data when the model is built, through a normalized
+    ServiceIndex of the sheet's service names: near-misses (case, accents, spacing,
+    't/m' spelling) resolve to the sheet's name and are listed in `miss_report`, and a
+    service that is missing or ambiguous raises a ValueError instead of showing up as
+    'not found' later.
+
+    Read-only once built, so one instance is shared by all sessions and threads: the
+    compiled arrays are not writeable, the mappings are MappingProxyType views, the
+    condition and service lists are tuples and df_costs hands out a copy of the cost
+    table, so a caller cannot change it behind the compiled costs. The only lazily filled state, the service
+    breakdown cache, is guarded by a lock.
+
+    dataset_version (a data_loader.DatasetVersion) records the workbook content the
+    model was built from, for display and for stamping reports.
+    """
     
-    def __init__(self, df_healthcare_costs: pd.DataFrame):
-        self.df_costs = df_healthcare_costs.set_index('codenaam')
-        self.COST_COLUMN = 'kosten per verzekerde 2024'
-        self.condition_cost_mapping = self._create_condition_mapping()
-
-    def _create_condition_mapping(self) -> dict:
-        return {
-            # 1. Mental Health and Stressmanagement
-            'Burn-Out': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Ergotherapie' , 'Gecombineerde leefstijlinterventies (GLI)', 'Fysiotherapie', 'Oefentherapie Mensendieck/Cesar', 'Kosten overige prestaties'],
-            'Depression': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Gecombineerde leefstijlinterventies (GLI)', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment', 'Intramuraal verblijf GGZ', 'Kosten overige prestaties'],
-            'Anxiety Disorder': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Gecombineerde leefstijlinterventies (GLI)', 'Intramuraal verblijf GGZ', 'Kosten overige prestaties'],
-            'Stress': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Gecombineerde leefstijlinterventies (GLI)', 'Intramuraal verblijf GGZ', 'Kosten overige prestaties'],
-
-            # 2. Physical Wellbeing and Health
-            'Hernia': ['Inschrijftarieven', 'Farmaceutische zorg', 'Fysiotherapie', 'Oefentherapie Mensendieck/Cesar', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment'],
-            'RSI': ['Inschrijftarieven', 'Farmaceutische zorg', 'Fysiotherapie', 'Ergotherapie', 'Oefentherapie Mensendieck/Cesar'],
-            'Osteoarthritis': ['Inschrijftarieven', 'Farmaceutische zorg', 'Fysiotherapie', 'Oefentherapie Mensendieck/Cesar', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment'],
-            'Cardiovascular diseases': ['Inschrijftarieven', 'Gecombineerde leefstijlinterventies (GLI)', 'Dieetadvisering', 'Farmaceutische zorg', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment', 'Add-ons dure geneesmiddelen', 'Fysiotherapie', 'Logopedie', 'Vervoer per ambulance en helikopter'],
-
-            # 3. Diet and Lifestyle Choices
-            'Eating disorder': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ', 'Dieetadvisering', 'Gecombineerde leefstijlinterventies (GLI)', 'Kosten overige prestaties'],
-            'Type 2 diabetes': ['Inschrijftarieven', 'Dieetadvisering', 'Gecombineerde leefstijlinterventies (GLI)', 'Farmaceutische zorg', 'Multidisciplinaire zorg', 'Hulpmiddelenzorg'],
-            'Certain cancers': ['Inschrijftarieven', 'Farmaceutische zorg', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment', 'Add-ons dure geneesmiddelen', 'Fysiotherapie', 'Logopedie', 'NTS (en SKION t/m 2021)'],
-            'High blood pressure': ['Inschrijftarieven', 'Consulten', 'Farmaceutische zorg', 'Eerstelijnsdiagnostiek', 'Multidisciplinaire zorg', 'Dieetadvisering', 'Gecombineerde leefstijlinterventies (GLI)'],
-
-            # 4. Sleep and Recovery
-            'Sleep apnea': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ', 'Eerstelijnsdiagnostiek', 'Integrale kosten DBC-zorgproducten gereguleerde segment', 'Integrale kosten DBC-zorgproducten vrije segment', 'Consulten', 'Avond-, nacht- en weekenddiensten', 'Hulpmiddelenzorg'],
-            'Narcolepsy': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ', 'Eerstelijnsdiagnostiek', 'Consulten', 'Avond-, nacht- en weekenddiensten'],
-            'Restless legs syndrome': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ', 'Eerstelijnsdiagnostiek', 'Consulten', 'Avond-, nacht- en weekenddiensten'],
-            'Chronic Fatigue': ['Inschrijftarieven', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ', 'Eerstelijnsdiagnostiek', 'Fysiotherapie', 'Oefentherapie Mensendieck/Cesar', 'Ergotherapie', 'Consulten', 'Avond-, nacht- en weekenddiensten', 'Geneeskundige zorg specifieke patiëntgroepen (GZSP)'],
-
-            # 5. Behavioural Change and Motivational Coaching
-            'Prevented suicide': ['Inschrijftarieven', 'Vervoer per ambulance en helikopter', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ'],
-            'Addiction': ['Inschrijftarieven', 'Vervoer per ambulance en helikopter', 'Farmaceutische zorg', 'Consulten GGZ','Intramuraal verblijf GGZ'],
-            'Violence': ['Inschrijftarieven', 'Vervoer per ambulance en helikopter', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ'],
-            'Abuse': ['Inschrijftarieven', 'Vervoer per ambulance en helikopter', 'Farmaceutische zorg', 'Consulten GGZ', 'Intramuraal verblijf GGZ']
-        }
-
-    def get_cost_per_condition(self, condition: str) -> tuple[float, str]:
-        if condition not in self.condition_cost_mapping:
-            debug_info = f"Warning: Condition '{condition}' not found in mapping."
-            return 0.0, debug_info
-
-        services = self.condition_cost_mapping[condition]
-        total_cost = 0.0
-        debug_info = f"Debug for {condition}:"
-        
-        for service in services:
+    def __init__(self, df_healthcare_costs: pd.DataFrame, cost_column: str = DEFAULT_COST_COLUMN,
+                 mapping: ConditionMapping = None, dataset_version=None):
+        self._df_costs = df_healthcare_costs.set_index('codenaam')
+        self.COST_COLUMN = cost_column
+        self.dataset_version = dataset_version
+        self.mapping = mapping if mapping is not None else self._create_condition_mapping()
+        self.service_lookup = ServiceIndex(self._df_costs.index)
+        self.service_matches, self.miss_report = self.mapping.resolve_services(self.service_lookup)
+        self.condition_cost_mapping = self.mapping.services_by_condition
+        self.categories = self.mapping.categories
+        self._compile_cost_matrix()
+        self._breakdowns = {}
+        self._breakdown_lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Mapping proxies and locks cannot be pickled (e.g. when sent to worker processes)
+        state = self.__dict__.copy()
+        for name in ('condition_cost_mapping', 'categories', 'condition_index', 'service_index'):
+            state[name] = dict(state[name])
+        del state['_breakdown_lock']
+        return state
+
+    def __setstate__(self, state: dict):
+        for name in ('condition_cost_mapping', 'categories', 'condition_index', 'service_index'):
+            state[name] = MappingProxyType(state[name])
+        self.__dict__.update(state)
+        self._breakdown_lock = threading.Lock()
+
+    @property
+    def df_costs(self) -> pd.DataFrame:
+        """The cost table indexed by service name (a copy)"""
+        return self._df_costs.copy()
+
+    @property
+    def version_label(self) -> str:
+        """Dataset and condition mapping versions the model was built from"""
+        parts = [self.dataset_version.label] if self.dataset_version is not None else []
+        if self.mapping.version:
+            parts.append(f"mapping v{self.mapping.version}")
+        return ', '.join(parts) or 'unversioned'
+
+    def _create_condition_mapping(self) -> ConditionMapping:
+        """The mapping used when none is passed in: the condition_mapping.csv data file"""
+        return load_condition_mapping()
+
+    @timed('HealthcareCostModel._compile_cost_matrix')
+    def _compile_cost_matrix(self):
+        """Resolve every mapped service once and build the condition x service incidence matrix"""
+        conditions = self.mapping.conditions
+        services = self.mapping.services
+        service_index = {service: j for j, service in enumerate(services)}
+
+        # Per service: cost (0.0 when unusable) and the lookup status shown in the breakdown
+        service_costs = np.zeros(len(services))
+        service_status = []
+        for j, match in enumerate(self.service_matches):
             try:
-                cost = self.df_costs.loc[service, self.COST_COLUMN].item()
-                debug_info += f" {service}: {cost}"
-                
-                if isinstance(cost, (int, float)):
-                    total_cost += cost
-                else:
-                    debug_info += f" (invalid type)"
-                
-            except KeyError:
-                debug_info += f" {service}: NOT FOUND"
-                debug_info += f" Available: {list(self.df_costs.index)}"
-            except ValueError as e:
-                debug_info += f" {service}: ERROR {e}"
-        
-        debug_info += f" Total: {total_cost}"
-        return total_cost, debug_info
+                cost = self._df_costs.loc[match.resolved, self.COST_COLUMN].item()
+            except ValueError:
+                service_status.append(SERVICE_ERROR)
+                continue
+
+            if isinstance(cost, (int, float)):
+                service_costs[j] = cost
+                service_status.append(SERVICE_FOUND)
+            else:
+                service_status.append(SERVICE_INVALID)
+
+        # The mapping's (condition id, service id) pairs follow the same condition and service order
+        incidence = np.zeros((len(conditions), len(services)))
+        np.add.at(incidence, (self.mapping.pair_condition_ids, self.mapping.pair_service_ids), 1.0)
+
+        self.conditions = conditions
+        self.condition_index = MappingProxyType({condition: i for i, condition in enumerate(conditions)})
+        self.services = services
+        self.service_index = MappingProxyType(service_index)
+        self.service_costs = _frozen(service_costs)
+        self.service_status = tuple(service_status)
+        self.incidence = _frozen(incidence)
+        self.condition_costs = _frozen(incidence @ service_costs)
+
+    def get_cost_per_condition(self, condition: str) -> float:
+        i = self.condition_index.get(condition)
+        if i is None:
+            return 0.0
+        return float(self.condition_costs[i])
+
+    @timed('HealthcareCostModel.get_cost_breakdown')
+    def get_cost_breakdown(self, condition: str) -> pd.DataFrame:
+        """Per-service costs of a condition (Service, Cost, Status), built on first request; shared, so do not modify"""
+        breakdown = self._breakdowns.get(condition)
+        if breakdown is None:
+            with self._breakdown_lock:
+                breakdown = self._breakdowns.get(condition)
+                if breakdown is None:
+                    service_ids = [self.service_index[service] for service in self.condition_cost_mapping.get(condition, ())]
+                    status = [self.service_status[j] for j in service_ids]
+                    breakdown = pd.DataFrame({
+                        'Service': [self.services[j] for j in service_ids],
+                        'Cost': [self.service_costs[j] if self.service_status[j] == SERVICE_FOUND else np.nan for j in service_ids],
+                        'Status': pd.Categorical(status, categories=SERVICE_STATUSES),
+                    })
+                    self._breakdowns[condition] = breakdown
+        return breakdown
     
 
 class ImpactTool:
     """Main tool for calculating healthcare impact"""
     
-    CATEGORIES = {
-        'Mental Health and Stress management': ['Burn-Out', 'Depression', 'Anxiety Disorder', 'Stress'],
-        'Physical wellbeing and health': ['Hernia', 'RSI', 'Osteoarthritis', 'Cardiovascular diseases'],
-        'Diet and lifestyle choices': ['Eating disorder', 'Type 2 diabetes', 'Certain cancers', 'High blood pressure'],
-        'Sleep and recovery': ['Sleep apnea', 'Narcolepsy', 'Restless legs syndrome', 'Chronic Fatigue'],
-        'Behavioural change and motivational coaching': ['Prevented suicide', 'Addiction', 'Violence', 'Abuse']
-    }
-
     def __init__(self, cost_model: HealthcareCostModel):
         self.cost_model = cost_model
         self.patients_per_condition = {}
-        self.total_patients_coach = 0
         self.results_df = None
-        self.debug_info = []
 
+    @timed('ImpactTool.calculate_impact')
     def calculate_impact(self, custom_costs=None):
-        self.debug_info = []
-        results = []
-        total_societal_cost = 0.0
-
-        for condition, count in self.patients_per_condition.items():
-            if count > 0:
-                if custom_costs and condition in custom_costs and custom_costs[condition] is not None:
-                    cost_per_patient = custom_costs[condition]
-                    debug_info = f"Debug for {condition}: Using custom cost € {cost_per_patient:,.2f}"
-                else:
-                    cost_per_patient, debug_info = self.cost_model.get_cost_per_condition(condition)
-                
-                self.debug_info.append(debug_info)
-                total_cost = count * cost_per_patient
-                total_societal_cost += total_cost
-                
-                results.append({
-                    'Condition': condition,
-                    'Patient_Count': count,
-                    'Costs per patient': cost_per_patient,
-                    'Total societal costs': total_cost
-                })
-
-        self.results_df = pd.DataFrame(results)
-        self.total_societal_cost = total_societal_cost
+        conditions = list(self.patients_per_condition)
+        counts = np.array([[self.patients_per_condition[condition] for condition in conditions]], dtype=float)
+        costs_per_patient, total_costs = self._score(counts, conditions, custom_costs)
+
+        self.results_df = pd.DataFrame([
+            {
+                'Condition': condition,
+                'Patient_Count': self.patients_per_condition[condition],
+                'Costs per patient': float(costs_per_patient[0, k]),
+                'Total societal costs': float(total_costs[0, k])
+            }
+            for k, condition in enumerate(conditions) if counts[0, k] > 0
+        ])
+        self.total_societal_cost = float(_row_totals(total_costs)[0])
+
+    @timed('ImpactTool.calculate_batch')
+    def calculate_batch(self, patient_counts, custom_costs=None) -> 'BatchImpactResult':
+        """Score many organisations at once.
+
+        patient_counts is an organisations x conditions DataFrame (columns are condition
+        names) or a NumPy array whose columns follow cost_model.conditions. custom_costs
+        may be a {condition: cost} dict applied to every organisation, or a DataFrame /
+        array shaped like patient_counts where NaN keeps the default cost.
+
+        A DataFrame column that is neither a condition of the cost model nor given a
+        cost in custom_costs raises a ValueError, rather than being scored at zero.
+        """
+        if isinstance(patient_counts, pd.DataFrame):
+            conditions = list(patient_counts.columns)
+            index = patient_counts.index
+            costed = set(custom_costs.columns) if isinstance(custom_costs, pd.DataFrame) else set(custom_costs or ())
+            unknown = [condition for condition in conditions
+                       if condition not in self.cost_model.condition_index and condition not in costed]
+            if unknown:
+                raise ValueError(f"Unknown condition column(s) {unknown}. Known conditions: {list(self.cost_model.conditions)}")
+            counts = patient_counts.to_numpy(dtype=float)
+        else:
+            conditions = list(self.cost_model.conditions)
+            counts = np.asarray(patient_counts, dtype=float)
+            index = pd.RangeIndex(counts.shape[0])
+            if counts.ndim != 2 or counts.shape[1] != len(conditions):
+                raise ValueError(f"Expected an array with {len(conditions)} condition columns, got shape {counts.shape}")
+
+        if isinstance(custom_costs, pd.DataFrame):
+            custom_costs = custom_costs.reindex(index=index, columns=conditions).to_numpy(dtype=float)
+
+        costs_per_patient, total_costs = self._score(counts, conditions, custom_costs)
+        return BatchImpactResult(
+            pd.DataFrame(counts, index=index, columns=conditions),
+            pd.DataFrame(costs_per_patient, index=index, columns=conditions),
+            pd.DataFrame(total_costs, index=index, columns=conditions)
+        )
+
+    def _score(self, counts: np.ndarray, conditions: list, custom_costs=None) -> tuple[np.ndarray, np.ndarray]:
+        """Cost per patient and total cost arrays for an organisations x conditions count matrix"""
+        condition_ids = np.array([self.cost_model.condition_index.get(condition, -1) for condition in conditions], dtype=int)
+        default_costs = np.where(condition_ids >= 0, self.cost_model.condition_costs[condition_ids], 0.0)
+        costs_per_patient = np.broadcast_to(default_costs, counts.shape)
+
+        if isinstance(custom_costs, dict):
+            overrides = np.array([
+                np.nan if custom_costs.get(condition) is None else custom_costs[condition]
+                for condition in conditions
+            ], dtype=float)
+            costs_per_patient = np.where(np.isnan(overrides), costs_per_patient, overrides)
+        elif custom_costs is not None:
+            overrides = np.asarray(custom_costs, dtype=float)
+            costs_per_patient = np.where(np.isnan(overrides), costs_per_patient, overrides)
+
+        total_costs = np.where(counts > 0, counts * costs_per_patient, 0.0)
+        return np.array(costs_per_patient, dtype=float), total_costs
+
+
+def _row_totals(total_costs: np.ndarray) -> np.ndarray:
+    """Left-to-right row sums, so single and batch scoring agree to the last bit whatever the batch shape"""
+    if total_costs.shape[1] == 0:
+        return np.zeros(total_costs.shape[0])
+    return np.cumsum(total_costs, axis=1)[:, -1]
+
+
+class BatchImpactResult:
+    """Per-organisation, per-condition outcome of ImpactTool.calculate_batch"""
+
+    def __init__(self, patient_counts: pd.DataFrame, costs_per_patient: pd.DataFrame, total_costs: pd.DataFrame):
+        self.patient_counts = patient_counts
+        self.costs_per_patient = costs_per_patient
+        self.total_costs = total_costs
+        self.org_totals = pd.Series(_row_totals(total_costs.to_numpy()), index=total_costs.index)
+        self.condition_totals = pd.Series(total_costs.to_numpy().sum(axis=0), index=total_costs.columns)
+
+    def to_long(self) -> pd.DataFrame:
+        """One row per organisation and condition with a non-zero patient count"""
+        long_df = pd.DataFrame({
+            'Organisation': np.repeat(self.total_costs.index.to_numpy(), self.total_costs.shape[1]),
+            'Condition': np.tile(self.total_costs.columns.to_numpy(), self.total_costs.shape[0]),
+            'Patient_Count': self.patient_counts.to_numpy().ravel(),
+            'Costs per patient': self.costs_per_patient.to_numpy().ravel(),
+            'Total societal costs': self.total_costs.to_numpy().ravel()
+        })
+        return long_df[long_df['Patient_Count'] > 0].reset_index(drop=True)
@@ -0,0 +1,191 @@
+"""
+Monte Carlo uncertainty analysis of scenario savings
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.models import HealthcareCostModel
+from utils.profiling import timed
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def sample_distribution(rng: np.random.Generator, spec: dict, size, center: float = 1.0) -> np.ndarray:
+    """Draw from a distribution spec.
+
+    Supported specs ({'dist': ..., parameters}):
+    - 'fixed': always `center`
+    - 'normal': mean `center`, standard deviation `cv` * center
+    - 'lognormal': mean `center`, coefficient of variation `cv`
+    - 'uniform': between `low` and `high`
+    - 'triangular': between `low` and `high` with mode `mode` (constant when low == high)
+    - 'beta': shape `a`, `b` scaled to [`low`, `high`] (default 0-1)
+    """
+    dist = spec.get('dist', 'fixed')
+    if dist == 'fixed':
+        return np.full(size, center, dtype=float)
+    if dist == 'normal':
+        return rng.normal(center, spec['cv'] * abs(center), size)
+    if dist == 'lognormal':
+        sigma = np.sqrt(np.log1p(spec['cv'] ** 2))
+        return center * rng.lognormal(-sigma ** 2 / 2, sigma, size)
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size)
+    if dist == 'triangular':
+        if spec['low'] == spec['high']:
+            # NumPy rejects a zero-width triangle; every draw is that one value
+            return np.full(size, spec['low'], dtype=float)
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+    if dist == 'beta':
+        low, high = spec.get('low', 0.0), spec.get('high', 1.0)
+        return low + (high - low) * rng.beta(spec['a'], spec['b'], size)
+    raise ValueError(f"Unknown distribution '{dist}'. Use fixed, normal, lognormal, uniform, triangular or beta.")
+
+
+class StreamingQuantiles:
+    """Bounded-memory quantile estimates over a stream of rows.
+
+    Keeps a uniform reservoir sample of at most `capacity` rows (exact while fewer rows
+    have been seen) plus exact running means.
+    """
+
+    def __init__(self, n_columns: int, capacity: int = 100_000, seed: int = 0):
+        self.capacity = capacity
+        self.reservoir = np.empty((capacity, n_columns))
+        self.seen = 0
+        self._sums = np.zeros(n_columns)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, rows: np.ndarray):
+        n_rows = len(rows)
+        self._sums += rows.sum(axis=0)
+
+        fill = min(max(self.capacity - self.seen, 0), n_rows)
+        self.reservoir[self.seen:self.seen + fill] = rows[:fill]
+
+        # Algorithm R for the rest: row t replaces a random slot with probability capacity / (t + 1)
+        if fill < n_rows:
+            positions = np.arange(self.seen + fill, self.seen + n_rows)
+            slots = self._rng.integers(0, positions + 1)
+            keep = np.flatnonzero(slots < self.capacity)
+            # Several rows can hit the same slot; like the sequential algorithm, the last one wins
+            last_slots, last_pos = np.unique(slots[keep][::-1], return_index=True)
+            self.reservoir[last_slots] = rows[fill + keep[::-1][last_pos]]
+        self.seen += n_rows
+
+    def quantiles(self, qs=DEFAULT_QUANTILES) -> np.ndarray:
+        sample = self.reservoir[:min(self.seen, self.capacity)]
+        return np.quantile(sample, qs, axis=0)
+
+    def means(self) -> np.ndarray:
+        return self._sums / max(self.seen, 1)
+
+
+def _build_structure(cost_model: HealthcareCostModel, conditions: list, custom_costs: dict):
+    """Service cost vector and conditions x services incidence, with one extra 'service' per custom cost"""
+    custom_costs = {condition: cost for condition, cost in (custom_costs or {}).items() if cost is not None}
+    extra = [condition for condition in conditions
+             if condition in custom_costs or condition not in cost_model.condition_index]
+
+    service_costs = np.concatenate([cost_model.service_costs, [custom_costs.get(condition, 0.0) for condition in extra]])
+    incidence = np.zeros((len(conditions), len(service_costs)))
+    for k, condition in enumerate(conditions):
+        if condition in extra:
+            incidence[k, len(cost_model.service_costs) + extra.index(condition)] = 1.0
+        else:
+            incidence[k, :len(cost_model.service_costs)] = cost_model.incidence[cost_model.condition_index[condition]]
+    return service_costs, incidence
+
+
+def simulate_chunk(seed, n_draws: int, counts: np.ndarray, service_costs: np.ndarray, incidence: np.ndarray,
+                   cost_spec: dict, reduction_spec: dict) -> np.ndarray:
+    """Savings for n_draws draws: one column for the total, then one per condition"""
+    rng = np.random.default_rng(seed)
+    multipliers = np.clip(sample_distribution(rng, cost_spec, (n_draws, len(service_costs))), 0, None)
+    costs_per_patient = (multipliers * service_costs) @ incidence.T
+    reductions = np.clip(sample_distribution(rng, reduction_spec, n_draws, center=reduction_spec.get('value', 0.0)), 0, 100)
+
+    # Same rounding to whole patients as the deterministic scenario
+    prevented = counts - np.clip(np.rint(counts * (1 - reductions[:, None] / 100)), 0, None)
+    savings = prevented * costs_per_patient
+
+    out = np.empty((n_draws, len(counts) + 1))
+    out[:, 0] = savings.sum(axis=1)
+    out[:, 1:] = savings
+    return out
+
+
+# Per-worker copy of the simulation inputs, set once by the pool initializer
+_worker_inputs = None
+
+
+def _init_worker(*inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _simulate_in_worker(seed, n_draws: int) -> np.ndarray:
+    return simulate_chunk(seed, n_draws, *_worker_inputs)
+
+
+class MonteCarloResult:
+    """Quantiles and means of simulated savings per condition and in total"""
+
+    def __init__(self, conditions: list, quantiles: tuple, accumulator: StreamingQuantiles):
+        self.conditions = conditions
+        self.quantile_levels = quantiles
+        self.draws = accumulator.seen
+        self.quantiles = accumulator.quantiles(quantiles)
+        self.means = accumulator.means()
+
+    def summary(self) -> pd.DataFrame:
+        summary = pd.DataFrame(
+            {f"P{q * 100:g}": self.quantiles[i] for i, q in enumerate(self.quantile_levels)},
+            index=pd.Index(['Total'] + self.conditions, name='Condition')
+        )
+        summary.insert(0, 'Mean', self.means)
+        return summary
+
+
+@timed()
+def simulate_savings(cost_model: HealthcareCostModel, patients_per_condition: dict, reduction_spec: dict,
+                     cost_spec: dict = None, custom_costs: dict = None, draws: int = 100_000, chunk_size: int = 50_000,
+                     seed: int = 0, workers: int = 1, quantiles: tuple = DEFAULT_QUANTILES,
+                     reservoir_size: int = 100_000) -> MonteCarloResult:
+    """Monte Carlo distribution of savings from a prevalence reduction.
+
+    Service costs are multiplied by draws from `cost_spec` (relative to 1.0, default
+    lognormal with 10% coefficient of variation) and pushed through the condition x
+    service mapping; the reduction percentage is drawn from `reduction_spec` ('value'
+    is the centre for fixed/normal/lognormal specs). Draws are generated in chunks of
+    `chunk_size`, each from its own child seed, so results depend only on `seed` and
+    `chunk_size` - not on the number of workers.
+    """
+    if cost_spec is None:
+        cost_spec = {'dist': 'lognormal', 'cv': 0.1}
+    conditions = [condition for condition, count in patients_per_condition.items() if count > 0]
+    counts = np.array([patients_per_condition[condition] for condition in conditions], dtype=float)
+    service_costs, incidence = _build_structure(cost_model, conditions, custom_costs)
+    inputs = (counts, service_costs, incidence, cost_spec, reduction_spec)
+
+    chunk_sizes = [min(chunk_size, draws - start) for start in range(0, draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes) + 1)
+    accumulator = StreamingQuantiles(len(conditions) + 1, reservoir_size, seed=seeds[-1])
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=inputs) as pool:
+            pending = deque()
+            for chunk_seed, n_draws in zip(seeds, chunk_sizes):
+                pending.append(pool.submit(_simulate_in_worker, chunk_seed, n_draws))
+                if len(pending) >= 2 * workers:
+                    accumulator.update(pending.popleft().result())
+            while pending:
+                accumulator.update(pending.popleft().result())
+    else:
+        for chunk_seed, n_draws in zip(seeds, chunk_sizes):
+            accumulator.update(simulate_chunk(chunk_seed, n_draws, *inputs))
+
+    return MonteCarloResult(conditions, quantiles, accumulator)
@@ -0,0 +1,98 @@
+"""
+Multi-year projection of base costs, scenario costs and savings
+"""
+import numpy as np
+import pandas as pd
+
+from utils.profiling import timed
+
+
+def ramp_up_fractions(years: int, ramp_up) -> np.ndarray:
+    """Share of the target reduction reached in each projection year.
+
+    `ramp_up` is a number of years for a linear ramp (0 = full effect from year 1) or
+    an explicit sequence of fractions, padded with its last value when shorter than
+    `years`.
+    """
+    if np.isscalar(ramp_up):
+        if ramp_up <= 0:
+            return np.ones(years)
+        return np.minimum(np.arange(1, years + 1) / ramp_up, 1.0)
+    fractions = np.asarray(ramp_up, dtype=float)[:years]
+    if len(fractions) < years:
+        fractions = np.concatenate([fractions, np.full(years - len(fractions), fractions[-1] if len(fractions) else 1.0)])
+    return np.clip(fractions, 0, 1)
+
+
+class ProjectionResult:
+    """Year x (organisation x) condition cost arrays of a projection"""
+
+    def __init__(self, years: np.ndarray, conditions: list, base_costs: np.ndarray, scenario_costs: np.ndarray,
+                 discount_factors: np.ndarray):
+        self.years = years
+        self.conditions = conditions
+        self.base_costs = base_costs
+        self.scenario_costs = scenario_costs
+        self.savings = base_costs - scenario_costs
+        self.discounted_savings = self.savings * discount_factors
+        self.cumulative_savings = np.cumsum(self.savings, axis=0)
+
+    def _condition_totals(self, values: np.ndarray) -> np.ndarray:
+        """Collapse any organisation axis, keeping (years, conditions)"""
+        return values.reshape(len(self.years), -1, len(self.conditions)).sum(axis=1)
+
+    def summary(self) -> pd.DataFrame:
+        """Cumulative and net present value savings per condition over the whole horizon"""
+        savings = self._condition_totals(self.savings)
+        discounted = self._condition_totals(self.discounted_savings)
+        return pd.DataFrame({
+            'Condition': self.conditions,
+            'Cumulative base costs': self._condition_totals(self.base_costs).sum(axis=0),
+            'Cumulative scenario costs': self._condition_totals(self.scenario_costs).sum(axis=0),
+            'Cumulative savings': savings.sum(axis=0),
+            'NPV savings': discounted.sum(axis=0)
+        })
+
+    def by_year(self) -> pd.DataFrame:
+        """Totals over all conditions (and organisations) per projection year"""
+        savings = self.savings.reshape(len(self.years), -1).sum(axis=1)
+        return pd.DataFrame({
+            'Year': self.years,
+            'Base costs': self.base_costs.reshape(len(self.years), -1).sum(axis=1),
+            'Scenario costs': self.scenario_costs.reshape(len(self.years), -1).sum(axis=1),
+            'Savings': savings,
+            'Cumulative savings': np.cumsum(savings),
+            'Discounted savings': self.discounted_savings.reshape(len(self.years), -1).sum(axis=1),
+            'Cumulative NPV savings': np.cumsum(self.discounted_savings.reshape(len(self.years), -1).sum(axis=1))
+        })
+
+
+@timed()
+def project_savings(base_costs, reduction_pct, conditions: list = None, years: int = 10, start_year: int = 2024,
+                    cost_inflation: float = 0.03, caseload_growth: float = 0.0, ramp_up=0,
+                    discount_rate: float = 0.03) -> ProjectionResult:
+    """Roll base-year costs forward and apply a (ramped) prevalence reduction.
+
+    `base_costs` holds the annual costs in `start_year`, shaped (conditions,) or
+    (organisations, conditions); `reduction_pct` is a scalar or broadcasts against it.
+    Year t (1..years) costs are base * ((1 + cost_inflation) * (1 + caseload_growth)) ** t,
+    the scenario removes reduction_pct * ramp_up_fractions[t] of them, and savings are
+    discounted by (1 + discount_rate) ** t. Patients are not rounded, as these are
+    expected values. Everything is one broadcast over a years x ... x conditions array.
+    """
+    base = np.asarray(base_costs, dtype=float)
+    if conditions is None:
+        conditions = [f"Condition {k + 1}" for k in range(base.shape[-1])]
+
+    t = np.arange(1, years + 1, dtype=float)
+    growth = ((1 + cost_inflation) * (1 + caseload_growth)) ** t
+    reached = ramp_up_fractions(years, ramp_up)
+    discount = (1 + discount_rate) ** -t
+
+    year_axis = (years,) + (1,) * base.ndim
+    projected_base = base[None, ...] * growth.reshape(year_axis)
+    reduction = np.clip(np.asarray(reduction_pct, dtype=float), 0, 100) / 100
+    projected_scenario = projected_base * (1 - reduction * reached.reshape(year_axis))
+
+    return ProjectionResult(start_year + t.astype(int), list(conditions), projected_base, projected_scenario,
+                            discount.reshape(year_axis))
@@ -0,0 +1,118 @@
+"""
+Prevalence reduction scenarios
+"""
+import numpy as np
+import pandas as pd
+
+from src.condition_mapping import load_condition_mapping
+from utils.profiling import timed
+
+
+def reduce_patients(patient_counts, reduction_pct):
+    """Patients left after a prevalence reduction, rounded to whole patients like the scenario table"""
+    counts = np.asarray(patient_counts, dtype=float)
+    reduced = np.rint(counts * (1 - np.asarray(reduction_pct, dtype=float) / 100))
+    return np.clip(reduced, 0, None)
+
+
+def apply_reduction(patient_counts, costs_per_patient, reduction_pct) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reduced patients, scenario costs and savings vs base for matching count and cost arrays"""
+    counts = np.asarray(patient_counts, dtype=float)
+    costs = np.asarray(costs_per_patient, dtype=float)
+    reduced = reduce_patients(counts, reduction_pct)
+    scenario_costs = reduced * costs
+    savings = counts * costs - scenario_costs
+    return reduced, scenario_costs, savings
+
+
+@timed()
+def scenario_table(results_df: pd.DataFrame, reduction_pct) -> pd.DataFrame:
+    """ImpactTool results with reduced patients, scenario costs and savings for one reduction percentage"""
+    scenario_df = results_df.rename(columns={'Patient_Count': 'Patient count', 'Total societal costs': 'Total healthcare costs'})
+    scenario_df['Reduced patients'] = reduce_patients(scenario_df['Patient count'], reduction_pct).astype(int)
+    scenario_df['Scenario costs'] = scenario_df['Reduced patients'] * scenario_df['Costs per patient']
+    scenario_df['Savings vs base'] = scenario_df['Total healthcare costs'] - scenario_df['Scenario costs']
+    return scenario_df
+
+
+def reduction_grid(conditions: list, reductions, per_condition: dict = None, per_category: dict = None,
+                   categories: dict = None) -> np.ndarray:
+    """Scenarios x conditions matrix of reduction percentages.
+
+    Every scenario starts from one value of `reductions`, applied to all conditions.
+    `per_category` ({category: pct}) and then `per_condition` ({condition: pct})
+    override that value for their conditions; a pct is either a scalar used in every
+    scenario or a sequence with one value per scenario. Categories default to those
+    of the condition mapping data file (see HealthcareCostModel.categories).
+    """
+    reductions = np.atleast_1d(np.asarray(reductions, dtype=float))
+    grid = np.repeat(reductions[:, None], len(conditions), axis=1)
+    column = {condition: k for k, condition in enumerate(conditions)}
+
+    if per_category:
+        if categories is None:
+            categories = load_condition_mapping().categories
+        for category, pct in per_category.items():
+            if category not in categories:
+                raise ValueError(f"Unknown category '{category}'. Available: {list(categories)}")
+            ids = [column[condition] for condition in categories[category] if condition in column]
+            grid[:, ids] = np.asarray(pct, dtype=float).reshape(-1, 1)
+
+    for condition, pct in (per_condition or {}).items():
+        if condition not in column:
+            raise ValueError(f"Unknown condition '{condition}'")
+        grid[:, column[condition]] = pct
+
+    return np.clip(grid, 0, 100)
+
+
+class ScenarioSweep:
+    """Base and scenario costs for a whole grid of reductions, computed in one broadcast"""
+
+    def __init__(self, conditions: list, patient_counts, costs_per_patient, reductions: np.ndarray, scenario_values=None):
+        self.conditions = list(conditions)
+        self.patient_counts = np.asarray(patient_counts, dtype=float)
+        self.costs_per_patient = np.asarray(costs_per_patient, dtype=float)
+        self.reductions = np.atleast_2d(np.asarray(reductions, dtype=float))
+        # Label of each scenario in totals(): the swept value, or the mean reduction over conditions
+        self.scenario_values = self.reductions.mean(axis=1) if scenario_values is None else np.asarray(scenario_values, dtype=float)
+        self.base_costs = self.patient_counts * self.costs_per_patient
+
+        # (scenarios, conditions) arrays
+        self.reduced_patients, self.scenario_costs, self.savings = apply_reduction(
+            self.patient_counts[None, :], self.costs_per_patient[None, :], self.reductions
+        )
+
+    @classmethod
+    @timed('ScenarioSweep.from_results')
+    def from_results(cls, results_df: pd.DataFrame, reductions, **grid_options) -> 'ScenarioSweep':
+        """Sweep over the rows of an ImpactTool results table"""
+        conditions = results_df['Condition'].tolist()
+        grid = reduction_grid(conditions, reductions, **grid_options)
+        return cls(conditions, results_df['Patient_Count'].to_numpy(), results_df['Costs per patient'].to_numpy(), grid,
+                   scenario_values=np.atleast_1d(np.asarray(reductions, dtype=float)))
+
+    def totals(self) -> pd.DataFrame:
+        """One row per scenario with total scenario costs and savings"""
+        return pd.DataFrame({
+            'Scenario': np.arange(len(self.reductions)),
+            'Reduction %': self.scenario_values,
+            'Base costs': np.full(len(self.reductions), self.base_costs.sum()),
+            'Scenario costs': self.scenario_costs.sum(axis=1),
+            'Savings vs base': self.savings.sum(axis=1)
+        })
+
+    def to_frame(self) -> pd.DataFrame:
+        """Tidy scenario cube: one row per scenario and condition"""
+        n_scenarios, n_conditions = self.reductions.shape
+        return pd.DataFrame({
+            'Scenario': np.repeat(np.arange(n_scenarios), n_conditions),
+            'Condition': np.tile(np.asarray(self.conditions, dtype=object), n_scenarios),
+            'Reduction %': self.reductions.ravel(),
+            'Patient count': np.tile(self.patient_counts, n_scenarios),
+            'Costs per patient': np.tile(self.costs_per_patient, n_scenarios),
+            'Total healthcare costs': np.tile(self.base_costs, n_scenarios),
+            'Reduced patients': self.reduced_patients.ravel(),
+            'Scenario costs': self.scenario_costs.ravel(),
+            'Savings vs base': self.savings.ravel()
+        })
@@ -0,0 +1,92 @@
+"""
+Normalized lookup of healthcare service names (`codenaam`) in the cost data
+"""
+import difflib
+import re
+import unicodedata
+from typing import NamedTuple
+
+MATCH_EXACT = 'exact'
+MATCH_NORMALIZED = 'normalized'
+MATCH_AMBIGUOUS = 'ambiguous'
+MATCH_MISSING = 'missing'
+
+# 'tot en met' / 't.m.' / 't / m' as a token of its own, not inside e.g. 't.m.s.'
+_THROUGH = re.compile(r'(?<![\w.])(?:tot\s+en\s+met\b|t\s*[/.]\s*m\.?(?![\w.]))')
+_PUNCTUATION_SPACE = re.compile(r'\s*([()\[\],/;:-])\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_service_name(name) -> str:
+    """Case-, accent- and whitespace-insensitive form of a service name; 't.m.' and 'tot en met' become 't/m'"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = _THROUGH.sub('t/m', text)
+    text = _PUNCTUATION_SPACE.sub(r'\1', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class ServiceMatch(NamedTuple):
+    """How a requested service name was found in the cost data; resolved is None unless found"""
+    requested: str
+    resolved: str
+    kind: str
+    suggestions: tuple = ()
+
+
+class ServiceIndex:
+    """Exact and normalized lookup of the service names of a cost sheet, built once.
+
+    A name that is not in the sheet as-is resolves to the sheet name with the same
+    normalized form, unless several different sheet names share it (ambiguous).
+    Lookups are dictionary hits whatever the size of the catalogue; only unresolved
+    names are compared against all names, to suggest the closest ones.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(dict.fromkeys(str(name) for name in names))
+        self._exact = frozenset(self.names)
+        normalized = {}
+        for name in self.names:
+            normalized.setdefault(normalize_service_name(name), []).append(name)
+        self._normalized = {key: tuple(candidates) for key, candidates in normalized.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(self, name: str) -> ServiceMatch:
+        if name in self._exact:
+            return ServiceMatch(name, name, MATCH_EXACT)
+        key = normalize_service_name(name)
+        candidates = self._normalized.get(key, ())
+        if len(candidates) == 1:
+            return ServiceMatch(name, candidates[0], MATCH_NORMALIZED)
+        if candidates:
+            return ServiceMatch(name, None, MATCH_AMBIGUOUS, candidates)
+        close = difflib.get_close_matches(key, self._normalized, n=3, cutoff=0.75)
+        return ServiceMatch(name, None, MATCH_MISSING, tuple(self._normalized[match][0] for match in close))
+
+    def resolve_all(self, names) -> tuple:
+        return tuple(self.resolve(name) for name in names)
+
+
+def build_miss_report(matches, used_by=None, label: str = '') -> str:
+    """Text report of the names that were not found exactly ('' when all were).
+
+    used_by maps a requested name to the conditions using it, for context.
+    """
+    lines = []
+    for match in matches:
+        if match.kind == MATCH_EXACT:
+            continue
+        users = f" (used by {', '.join(used_by[match.requested])})" if used_by and used_by.get(match.requested) else ''
+        if match.kind == MATCH_NORMALIZED:
+            lines.append(f"- '{match.requested}' matched '{match.resolved}' after normalizing{users}")
+        elif match.kind == MATCH_AMBIGUOUS:
+            lines.append(f"- '{match.requested}' is ambiguous between {', '.join(repr(name) for name in match.suggestions)}{users}")
+        else:
+            hint = f"; closest: {', '.join(repr(name) for name in match.suggestions)}" if match.suggestions else ''
+            lines.append(f"- '{match.requested}' not found{users}{hint}")
+    if not lines:
+        return ''
+    return f"Service names {label}not found exactly in the cost data:\n" + '\n'.join(lines)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The app imports its modules as top-level `src` / `utils` packages
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# The bundled data files the app and the batch scorer load by default
+DATA_PATH = os.path.join(APP_DIR, 'insurance_dataset.xlsx')
+MAPPING_PATH = os.path.join(APP_DIR, 'condition_mapping.csv')
+
+from src.condition_mapping import ConditionMapping  # noqa: E402
+from src.models import DEFAULT_COST_COLUMN, HealthcareCostModel  # noqa: E402
+
+
+@pytest.fixture
+def small_cost_model():
+    """Three conditions over three services: X = 120, Y = 23, Z = 6 per patient"""
+    df = pd.DataFrame({'codenaam': ['A', 'B', 'C'], DEFAULT_COST_COLUMN: [100.0, 20.0, 3.0]})
+    mapping = ConditionMapping.from_dict({'X': ['A', 'B'], 'Y': ['B', 'C'], 'Z': ['C', 'C']}, version='test')
+    return HealthcareCostModel(df, mapping=mapping)
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import run_batch, write_organisation_reports
+from conftest import DATA_PATH
+from utils.dataset_registry import get_dataset_registry
+
+
+def write_caseloads(path):
+    pd.DataFrame({'organisation': ['a', 'b'], 'Depression': [3, 0], 'Burn-Out': [1, 2]}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_colliding_organisation_names_get_separate_reports(tmp_path):
+    input_path = tmp_path / 'caseloads.csv'
+    pd.DataFrame({
+        'organisation': ['org 0', 'org_0', 'ORG/0'],
+        'Depression': [1, 2, 3],
+        'Burn-Out': [0, 1, 0],
+    }).to_csv(input_path, index=False)
+
+    report_dir = tmp_path / 'reports'
+    stats = write_organisation_reports(str(input_path), str(report_dir), 'txt', reduction_pct=10)
+
+    assert stats['reports'] == 3
+    assert sorted(os.listdir(report_dir)) == ['ORG_0_3.txt', 'org_0.txt', 'org_0_2.txt']
+    patients = sorted(
+        next(line for line in (report_dir / name).read_text(encoding='utf-8').splitlines()
+             if line.startswith('Total patients entered'))
+        for name in os.listdir(report_dir)
+    )
+    assert patients == ['Total patients entered: 1', 'Total patients entered: 3', 'Total patients entered: 3']
+
+
+def test_batch_run_rejects_a_misspelled_condition_header(tmp_path):
+    input_path = tmp_path / 'caseloads.csv'
+    pd.DataFrame({'organisation': ['a'], 'Depresion': [4]}).to_csv(input_path, index=False)
+    with pytest.raises(ValueError, match="Depresion"):
+        run_batch(str(input_path), str(tmp_path / 'results.csv'))
+
+
+def test_parallel_chunks_are_written_in_input_order(tmp_path):
+    rng = np.random.default_rng(0)
+    organisations = [f"org {k}" for k in rng.permutation(25)]
+    input_path = tmp_path / 'caseloads.csv'
+    pd.DataFrame({
+        'organisation': organisations,
+        'Depression': rng.integers(0, 20, 25),
+        'Stress': rng.integers(0, 20, 25),
+        'Burn-Out': rng.integers(0, 3, 25),
+    }).to_csv(input_path, index=False)
+
+    outputs = {}
+    for workers in (1, 3):
+        output_path = tmp_path / f'results_{workers}.csv'
+        stats = run_batch(str(input_path), str(output_path), reduction_pct=10, chunk_size=4, totals_only=True, workers=workers)
+        assert stats['organisations'] == 25
+        outputs[workers] = pd.read_csv(output_path, skiprows=1)
+
+    assert outputs[3]['Organisation'].tolist() == organisations
+    pd.testing.assert_frame_equal(outputs[1], outputs[3])
+
+
+def test_batch_csv_output_is_stamped_with_the_cost_data_version(tmp_path):
+    output_path = tmp_path / 'results.csv'
+    stats = run_batch(write_caseloads(tmp_path / 'caseloads.csv'), str(output_path), totals_only=True)
+    assert stats['dataset_version'] == get_dataset_registry(DATA_PATH).get_cost_model().version_label
+    first_line = output_path.read_text(encoding='utf-8').splitlines()[0]
+    assert first_line == f"# cost data: {stats['dataset_version']}"
+    assert pd.read_csv(output_path, skiprows=1)['Organisation'].tolist() == ['a', 'b']
+
+
+def test_batch_parquet_output_is_stamped_with_the_cost_data_version(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output_path = tmp_path / 'results.parquet'
+    stats = run_batch(write_caseloads(tmp_path / 'caseloads.csv'), str(output_path), reduction_pct=10, chunk_size=1)
+    metadata = pq.read_schema(output_path).metadata
+    assert metadata[b'cost_data_version'].decode('utf-8') == stats['dataset_version']
+    assert len(pq.read_table(output_path)) == 3
+
+
+def test_organisation_csv_reports_are_stamped_with_the_cost_data_version(tmp_path):
+    report_dir = tmp_path / 'reports'
+    write_organisation_reports(write_caseloads(tmp_path / 'caseloads.csv'), str(report_dir), 'csv', reduction_pct=10)
+    version = get_dataset_registry(DATA_PATH).get_cost_model().version_label
+    for name in ('a.csv', 'b.csv'):
+        assert (report_dir / name).read_text(encoding='utf-8').splitlines()[0] == f"# cost data: {version}"
+
+
+def test_module_invocation_from_the_repository_root(tmp_path):
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output_path = tmp_path / 'results.csv'
+    completed = subprocess.run(
+        [sys.executable, '-m', 'impact_valuation_tool.batch', write_caseloads(tmp_path / 'caseloads.csv'), str(output_path),
+         '--totals-only'],
+        cwd=repo_root, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert pd.read_csv(output_path, skiprows=1)['Organisation'].tolist() == ['a', 'b']
@@ -0,0 +1,46 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from utils.data_loader import COST_SHEET, find_cost_columns, load_cost_data, parse_number, read_sheet_header
+
+
+@pytest.mark.parametrize('value, expected', [
+    (12, 12.0),
+    (12.5, 12.5),
+    ('12,5', 12.5),
+    ('1.234,56', 1234.56),
+    ('1,234.56', 1234.56),
+    ('€ 1.234,56', 1234.56),
+    ('1\xa0234,5', 1234.5),
+    ('1.234.567', 1234567.0),
+    ('1,234,567', 1234567.0),
+    ('-3,25', -3.25),
+    ('0.5', 0.5),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value', [None, '', 'n.v.t.', '-', True, pd.Timestamp('2024-01-01')])
+def test_parse_number_returns_nan_for_non_numbers(value):
+    assert np.isnan(parse_number(value))
+
+
+def test_cost_data_snapshot_round_trip(tmp_path):
+    workbook = tmp_path / 'costs.xlsx'
+    shutil.copyfile(DATA_PATH, workbook)
+
+    streamed = load_cost_data(str(workbook), use_snapshot=False)
+    first = load_cost_data(str(workbook))
+    assert (tmp_path / f'costs.{COST_SHEET}.costs.snapshot.npy').exists()
+    cached = load_cost_data(str(workbook))
+    pd.testing.assert_frame_equal(first, streamed)
+    pd.testing.assert_frame_equal(cached, streamed)
+
+    header = read_sheet_header(str(workbook), COST_SHEET)
+    assert 'codenaam' in header
+    assert set(find_cost_columns(header).values()) == set(streamed.columns) - {'codenaam'}
@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import numpy as np
+import openpyxl
+import pytest
+
+from conftest import DATA_PATH
+from utils.data_loader import COST_SHEET
+from utils.dataset_registry import DatasetRegistry
+
+
+def _scale_costs(path, factor: float):
+    """Multiply every number in the cost sheet and give the file a new modification time"""
+    workbook = openpyxl.load_workbook(path)
+    for row in workbook[COST_SHEET].iter_rows(min_row=2):
+        for cell in row:
+            if isinstance(cell.value, (int, float)) and not isinstance(cell.value, bool):
+                cell.value = cell.value * factor
+    workbook.save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'costs.xlsx'
+    shutil.copyfile(DATA_PATH, path)
+    return str(path)
+
+
+def test_models_are_reused_per_year(workbook):
+    registry = DatasetRegistry(workbook, max_loaded=1)
+    years = registry.years()
+    model = registry.get_cost_model()
+    assert registry.get_cost_model(years[-1]) is model
+    assert registry.get_cost_model(years[0]).COST_COLUMN.endswith(str(years[0]))
+    # Evicted by the other year (max_loaded=1), so looked up again
+    registry.get_cost_model(years[-1])
+    assert registry.stats() == {'hits': 1, 'misses': 3, 'reloads': 0, 'loaded': 1}
+
+
+def test_without_a_watcher_changes_are_picked_up_by_the_next_call(workbook):
+    registry = DatasetRegistry(workbook)
+    before = registry.get_cost_model()
+    _scale_costs(workbook, 2)
+    after = registry.get_cost_model()
+    np.testing.assert_allclose(after.condition_costs, 2 * before.condition_costs)
+    assert after.dataset_version.content_hash != before.dataset_version.content_hash
+
+
+def test_reload_swaps_models_off_the_request_path(workbook):
+    registry = DatasetRegistry(workbook)
+    registry.watch(interval=3600)
+    try:
+        before = registry.get_cost_model()
+        before_costs = before.condition_costs.copy()
+        assert registry.reload() is False
+
+        _scale_costs(workbook, 2)
+        # Requests keep the current snapshot until the reload has built the new models
+        assert registry.get_cost_model() is before
+
+        assert registry.reload() is True
+        after = registry.get_cost_model()
+        assert after is not before
+        assert after.version_label != before.version_label
+        np.testing.assert_allclose(after.condition_costs, 2 * before.condition_costs)
+        # A session still holding the old model finishes on unchanged numbers
+        np.testing.assert_array_equal(before.condition_costs, before_costs)
+        assert registry.stats()['reloads'] == 1
+    finally:
+        registry.stop_watching()
+
+
+def test_failed_reload_keeps_the_loaded_version(workbook):
+    registry = DatasetRegistry(workbook)
+    registry.watch(interval=3600)
+    try:
+        before = registry.get_cost_model()
+        with open(workbook, 'wb') as f:
+            f.write(b'half a workbook')
+        with pytest.raises(Exception):
+            registry.reload()
+        assert registry.get_cost_model() is before
+        assert registry.stats()['reloads'] == 0
+    finally:
+        registry.stop_watching()
+
+
+def test_watcher_reloads_in_the_background(workbook):
+    registry = DatasetRegistry(workbook)
+    watcher = registry.watch(interval=0.05)
+    try:
+        assert registry.watch() is watcher
+        before = registry.get_cost_model()
+        _scale_costs(workbook, 3)
+        for _ in range(200):
+            if registry.get_cost_model() is not before:
+                break
+            watcher._stop_event.wait(0.05)
+        np.testing.assert_allclose(registry.get_cost_model().condition_costs, 3 * before.condition_costs)
+        assert watcher.last_error is None
+    finally:
+        registry.stop_watching()
+    assert registry.watcher is None
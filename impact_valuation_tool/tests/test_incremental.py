@@ -0,0 +1,64 @@
+from src.incremental import IncrementalCalculator, duplicate_custom_names
+from src.models import ImpactTool
+
+
+def _full_total(cost_model, patients):
+    tool = ImpactTool(cost_model)
+    tool.patients_per_condition = dict(patients)
+    tool.calculate_impact()
+    return tool.total_societal_cost
+
+
+def test_editing_one_row_reuses_the_others(small_cost_model):
+    calculator = IncrementalCalculator(small_cost_model)
+    assert calculator.update({'X': 2, 'Y': 3, 'Z': 1}) == {'X', 'Y', 'Z'}
+    rows = dict(calculator._rows)
+
+    assert calculator.update({'X': 2, 'Y': 7, 'Z': 1}) == {'Y'}
+    assert calculator._rows['X'] is rows['X']
+    assert calculator._rows['Z'] is rows['Z']
+    assert calculator._rows['Y'] == ('Y', 7, 23.0, 161.0)
+    assert calculator.results_df['Total societal costs'].tolist() == [240.0, 161.0, 6.0]
+    assert calculator.total_cost == _full_total(small_cost_model, {'X': 2, 'Y': 7, 'Z': 1})
+
+
+def test_unchanged_inputs_keep_the_results_table(small_cost_model):
+    calculator = IncrementalCalculator(small_cost_model)
+    calculator.update({'X': 2, 'Y': 3, 'Z': 0})
+    results_df = calculator.results_df
+    assert calculator.update({'X': 2, 'Y': 3, 'Z': 0}) == set()
+    assert calculator.results_df is results_df
+
+
+def test_removed_custom_and_overridden_rows(small_cost_model):
+    calculator = IncrementalCalculator(small_cost_model)
+    calculator.update({'X': 1, 'Y': 1, 'Z': 1}, custom_conditions=[('Back pain', 2, 50.0)])
+    assert calculator.total_cost == 120.0 + 23.0 + 6.0 + 100.0
+
+    changed = calculator.update({'X': 1, 'Y': 0, 'Z': 1}, custom_costs={'Z': 10.0}, custom_conditions=[('Back pain', 2, 50.0)])
+    assert changed == {'Y', 'Z'}
+    assert calculator.results_df['Condition'].tolist() == ['X', 'Z', 'Back pain']
+    assert calculator.total_cost == 120.0 + 10.0 + 100.0
+
+    assert calculator.update({'X': 1, 'Y': 0, 'Z': 1}, custom_costs={'Z': 10.0}) == {('custom', 0)}
+    assert calculator.total_cost == 130.0
+
+
+def test_totals_match_a_full_recalculation_exactly(small_cost_model):
+    calculator = IncrementalCalculator(small_cost_model)
+    for patients in ({'X': 3, 'Y': 11, 'Z': 7}, {'X': 3, 'Y': 12, 'Z': 7}, {'X': 0, 'Y': 12, 'Z': 9}, {'X': 5, 'Y': 0, 'Z': 0}):
+        calculator.update(patients)
+        assert calculator.total_cost == _full_total(small_cost_model, patients)
+
+
+def test_custom_conditions_named_like_another_condition_are_left_out(small_cost_model):
+    calculator = IncrementalCalculator(small_cost_model)
+    calculator.update({'X': 1, 'Y': 0, 'Z': 0},
+                      custom_conditions=[(' x ', 5, 10.0), ('Back pain', 2, 50.0), ('back pain', 1, 70.0)])
+    assert calculator.results_df['Condition'].tolist() == ['X', 'Back pain']
+    assert calculator.results_df['Condition'].is_unique
+    assert calculator.total_cost == 120.0 + 100.0
+
+
+def test_duplicate_custom_names_ignores_blank_names():
+    assert duplicate_custom_names(['X'], ['', 'A', ' ', 'a', 'X']) == {3, 4}
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH, MAPPING_PATH
+from src.condition_mapping import load_condition_mapping
+from src.models import ImpactTool
+from utils.data_loader import get_cached_dataset
+
+
+def test_calculate_batch_rejects_unknown_condition_columns(small_cost_model):
+    counts = pd.DataFrame({'X': [1, 2], 'Depresion': [3, 4]}, index=['a', 'b'])
+    with pytest.raises(ValueError, match="Depresion"):
+        ImpactTool(small_cost_model).calculate_batch(counts)
+
+
+def test_calculate_batch_accepts_columns_with_a_custom_cost(small_cost_model):
+    counts = pd.DataFrame({'X': [1, 2], 'Back pain': [3, 0]}, index=['a', 'b'])
+    result = ImpactTool(small_cost_model).calculate_batch(counts, custom_costs={'Back pain': 10.0})
+    np.testing.assert_array_equal(result.org_totals.to_numpy(), [150.0, 240.0])
+
+
+def test_cached_dataset_hands_out_copies_of_the_shared_costs():
+    dataset = get_cached_dataset(DATA_PATH)
+    costs_df = dataset.costs_df
+    column = dataset.cost_model.COST_COLUMN
+    costs_df[column] = -1.0
+    assert (get_cached_dataset(DATA_PATH).costs_df[column] >= 0).all()
+
+
+def test_condition_costs_count_repeated_services(small_cost_model):
+    assert small_cost_model.get_cost_per_condition('X') == 120.0
+    assert small_cost_model.get_cost_per_condition('Y') == 23.0
+    assert small_cost_model.get_cost_per_condition('Z') == 6.0
+    assert small_cost_model.get_cost_per_condition('Unknown') == 0.0
+
+
+def test_condition_costs_match_a_per_service_lookup_on_the_workbook():
+    cost_model = get_cached_dataset(DATA_PATH).cost_model
+    mapping = load_condition_mapping(MAPPING_PATH)
+    assert cost_model.conditions == mapping.conditions
+    resolved = {service: match.resolved for service, match in zip(cost_model.services, cost_model.service_matches)}
+    costs = cost_model.df_costs[cost_model.COST_COLUMN]
+    for condition in mapping.conditions:
+        expected = 0.0
+        for service in mapping.services_by_condition[condition]:
+            expected += float(costs.loc[resolved[service]])
+        assert cost_model.get_cost_per_condition(condition) == pytest.approx(expected, rel=0, abs=1e-9), condition
+
+
+def test_calculate_batch_matches_calculate_impact_per_organisation():
+    cost_model = get_cached_dataset(DATA_PATH).cost_model
+    rng = np.random.default_rng(7)
+    counts = pd.DataFrame(rng.integers(0, 50, size=(5, len(cost_model.conditions))),
+                          index=[f"org {i}" for i in range(5)], columns=list(cost_model.conditions))
+    custom_costs = {cost_model.conditions[0]: 1234.5}
+    batch = ImpactTool(cost_model).calculate_batch(counts, custom_costs=custom_costs)
+
+    for organisation, row in counts.iterrows():
+        tool = ImpactTool(cost_model)
+        tool.patients_per_condition = row.to_dict()
+        tool.calculate_impact(custom_costs=custom_costs)
+        assert batch.org_totals[organisation] == tool.total_societal_cost
+        single = tool.results_df.set_index('Condition')['Total societal costs']
+        np.testing.assert_array_equal(batch.total_costs.loc[organisation, single.index].to_numpy(), single.to_numpy())
+
+
+def test_cost_model_is_read_only(small_cost_model):
+    for array in (small_cost_model.service_costs, small_cost_model.incidence, small_cost_model.condition_costs):
+        with pytest.raises(ValueError):
+            array[0] = 0.0
+    with pytest.raises(TypeError):
+        small_cost_model.condition_index['X'] = 1
+
+    df_costs = small_cost_model.df_costs
+    df_costs[small_cost_model.COST_COLUMN] = 0.0
+    assert small_cost_model.df_costs[small_cost_model.COST_COLUMN].tolist() == [100.0, 20.0, 3.0]
+    assert small_cost_model.get_cost_per_condition('X') == 120.0
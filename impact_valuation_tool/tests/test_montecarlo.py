@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from src.models import ImpactTool
+from src.montecarlo import StreamingQuantiles, sample_distribution, simulate_savings
+from src.scenarios import scenario_table
+
+
+def test_quantiles_are_exact_below_the_reservoir_capacity():
+    rows = np.random.default_rng(1).normal(size=(900, 2))
+    accumulator = StreamingQuantiles(2, capacity=1000)
+    for chunk in np.array_split(rows, 7):
+        accumulator.update(chunk)
+    np.testing.assert_allclose(accumulator.quantiles((0.05, 0.5, 0.95)), np.quantile(rows, (0.05, 0.5, 0.95), axis=0))
+    np.testing.assert_allclose(accumulator.means(), rows.mean(axis=0))
+
+
+def test_reservoir_stays_bounded_and_representative():
+    rows = np.random.default_rng(2).uniform(size=(200_000, 1))
+    accumulator = StreamingQuantiles(1, capacity=5_000, seed=3)
+    for chunk in np.array_split(rows, 40):
+        accumulator.update(chunk)
+    assert accumulator.seen == 200_000
+    assert accumulator.reservoir.shape == (5_000, 1)
+    np.testing.assert_allclose(accumulator.quantiles((0.05, 0.5, 0.95))[:, 0], [0.05, 0.5, 0.95], atol=0.02)
+    np.testing.assert_allclose(accumulator.means(), rows.mean(axis=0))
+
+
+def test_fixed_inputs_reproduce_the_deterministic_scenario(small_cost_model):
+    patients = {'X': 10, 'Y': 7, 'Z': 0}
+    result = simulate_savings(small_cost_model, patients, {'dist': 'fixed', 'value': 20}, cost_spec={'dist': 'fixed'},
+                              draws=1_000, chunk_size=300)
+    tool = ImpactTool(small_cost_model)
+    tool.patients_per_condition = patients
+    tool.calculate_impact()
+    savings = scenario_table(tool.results_df, 20)['Savings vs base'].to_numpy()
+
+    summary = result.summary()
+    assert result.draws == 1_000
+    assert summary.index.tolist() == ['Total', 'X', 'Y']
+    for column in ('Mean', 'P5', 'P50', 'P95'):
+        np.testing.assert_allclose(summary[column].to_numpy(), [savings.sum(), *savings])
+
+
+def test_results_depend_on_the_seed_only(small_cost_model):
+    patients = {'X': 10, 'Y': 7}
+    options = dict(reduction_spec={'dist': 'triangular', 'low': 5, 'mode': 10, 'high': 20}, draws=4_000, chunk_size=1_000)
+    first = simulate_savings(small_cost_model, patients, seed=7, **options).summary()
+    pd.testing.assert_frame_equal(first, simulate_savings(small_cost_model, patients, seed=7, **options).summary())
+    pd.testing.assert_frame_equal(first, simulate_savings(small_cost_model, patients, seed=7, workers=2, **options).summary())
+    assert not first.equals(simulate_savings(small_cost_model, patients, seed=8, **options).summary())
+
+
+def test_custom_costs_replace_the_mapped_cost(small_cost_model):
+    result = simulate_savings(small_cost_model, {'X': 10, 'Back pain': 4}, {'dist': 'fixed', 'value': 50},
+                              cost_spec={'dist': 'fixed'}, custom_costs={'X': 1.0, 'Back pain': 100.0}, draws=10)
+    np.testing.assert_allclose(result.summary()['Mean'].to_numpy(), [205.0, 5.0, 200.0])
+
+
+def test_zero_width_triangular_reduction_is_constant(small_cost_model):
+    draws = sample_distribution(np.random.default_rng(0), {'dist': 'triangular', 'low': 10, 'mode': 10, 'high': 10}, 5)
+    np.testing.assert_array_equal(draws, np.full(5, 10.0))
+
+    patients = {'X': 10, 'Y': 7}
+    degenerate = simulate_savings(small_cost_model, patients, {'dist': 'triangular', 'low': 10, 'mode': 10, 'high': 10},
+                                  cost_spec={'dist': 'fixed'}, draws=100)
+    fixed = simulate_savings(small_cost_model, patients, {'dist': 'fixed', 'value': 10}, cost_spec={'dist': 'fixed'}, draws=100)
+    pd.testing.assert_frame_equal(degenerate.summary(), fixed.summary())
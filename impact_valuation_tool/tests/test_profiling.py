@@ -0,0 +1,63 @@
+from utils.profiling import Profiler, span, stage, timed
+
+
+@timed('double')
+def double(x):
+    return 2 * x
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.rerun():
+        stage('Load')
+        with span('block'):
+            assert double(2) == 4
+    assert list(profiler.reruns) == []
+    assert profiler.stage_table() == []
+    assert profiler.call_table() == []
+
+
+def test_rerun_records_stages_and_nested_spans():
+    profiler = Profiler()
+    profiler.enabled = True
+    with profiler.rerun('first'):
+        stage('Load')
+        double(1)
+        double(2)
+        stage('Render')
+        with span('block'):
+            double(3)
+
+    rerun = profiler.reruns[-1]
+    assert rerun['label'] == 'first'
+    assert [(s['name'], s['depth']) for s in rerun['spans']] == [
+        ('double', 1), ('double', 1), ('Load', 0), ('double', 2), ('block', 1), ('Render', 0)]
+
+    (row,) = profiler.stage_table()
+    assert list(row) == ['Load', 'Render', 'Total']
+    assert row['Total'] >= row['Load'] + row['Render']
+
+    calls = {call['Span']: call['Calls'] for call in profiler.call_table()}
+    assert calls == {'double': 3, 'block': 1}
+
+
+def test_spans_outside_a_rerun_are_not_recorded():
+    profiler = Profiler()
+    profiler.enabled = True
+    with profiler.rerun():
+        stage('Load')
+    double(1)
+    with span('after'):
+        pass
+    assert [s['name'] for s in profiler.reruns[-1]['spans']] == ['Load']
+
+
+def test_history_keeps_the_latest_reruns():
+    profiler = Profiler(history=2)
+    profiler.enabled = True
+    for label in ('a', 'b', 'c'):
+        with profiler.rerun(label):
+            stage('Load')
+    assert [rerun['label'] for rerun in profiler.reruns] == ['b', 'c']
+    profiler.clear()
+    assert profiler.stage_table() == []
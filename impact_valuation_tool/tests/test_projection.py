@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.projection import project_savings, ramp_up_fractions
+
+
+@pytest.mark.parametrize('ramp_up, expected', [
+    (0, [1, 1, 1, 1]),
+    (-1, [1, 1, 1, 1]),
+    (2, [0.5, 1, 1, 1]),
+    (3, [1 / 3, 2 / 3, 1, 1]),
+    ([0.2, 0.6], [0.2, 0.6, 0.6, 0.6]),
+    ([0.1, 0.5, 0.9, 1.0, 1.0, 1.0], [0.1, 0.5, 0.9, 1.0]),
+    ([], [1, 1, 1, 1]),
+    ([-0.5, 1.5], [0, 1, 1, 1]),
+])
+def test_ramp_up_fractions(ramp_up, expected):
+    np.testing.assert_allclose(ramp_up_fractions(4, ramp_up), expected)
+
+
+def test_projection_compounds_ramps_and_discounts():
+    base = np.array([1000.0, 200.0])
+    result = project_savings(base, 10, conditions=['A', 'B'], years=3, start_year=2024, cost_inflation=0.05,
+                             caseload_growth=0.02, ramp_up=2, discount_rate=0.04)
+    growth = (1.05 * 1.02) ** np.arange(1, 4)
+    reached = np.array([0.5, 1.0, 1.0])
+
+    assert result.years.tolist() == [2025, 2026, 2027]
+    np.testing.assert_allclose(result.base_costs, growth[:, None] * base)
+    np.testing.assert_allclose(result.savings, growth[:, None] * base * 0.1 * reached[:, None])
+    np.testing.assert_allclose(result.discounted_savings, result.savings / 1.04 ** np.arange(1, 4)[:, None])
+
+    by_year = result.by_year()
+    np.testing.assert_allclose(by_year['Cumulative savings'], np.cumsum(result.savings.sum(axis=1)))
+    summary = result.summary()
+    np.testing.assert_allclose(summary['Cumulative savings'], result.savings.sum(axis=0))
+    np.testing.assert_allclose(summary['NPV savings'], result.discounted_savings.sum(axis=0))
+
+
+def test_organisation_axis_and_per_organisation_reductions():
+    base = np.array([[100.0, 50.0], [10.0, 0.0]])
+    result = project_savings(base, np.array([[50.0], [100.0]]), years=2, cost_inflation=0.0, discount_rate=0.0)
+    assert result.base_costs.shape == (2, 2, 2)
+    assert result.conditions == ['Condition 1', 'Condition 2']
+    np.testing.assert_allclose(result.summary()['Cumulative savings'], [2 * (50 + 10), 2 * 25])
+    np.testing.assert_allclose(result.by_year()['Savings'], [85.0, 85.0])
+
+
+def test_reduction_is_clipped_to_0_100():
+    result = project_savings(np.array([100.0]), 150, years=1, cost_inflation=0.0)
+    np.testing.assert_allclose(result.scenario_costs, [[0.0]])
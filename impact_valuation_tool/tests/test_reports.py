@@ -0,0 +1,58 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from src.models import ImpactTool
+from src.scenarios import scenario_table
+from utils.reports import REPORT_FORMATS, ReportData, iter_service_breakdown, render_report, write_report
+
+
+@pytest.fixture
+def report_data(small_cost_model):
+    tool = ImpactTool(small_cost_model)
+    tool.patients_per_condition = {'X': 10, 'Y': 4, 'Z': 0}
+    tool.calculate_impact(custom_costs={'Y': 50.0})
+    return ReportData(14, tool.total_societal_cost, 20, tool.results_df, scenario_table(tool.results_df, 20),
+                      small_cost_model, frozenset({'Y'}), pd.Timestamp('2025-01-02 03:04:05'))
+
+
+def test_text_report(report_data):
+    text = render_report(report_data, 'txt').decode('utf-8')
+    assert 'Generated: 2025-01-02 03:04:05\nCost data: mapping vtest\n' in text
+    assert 'Total Annual Societal Healthcare Costs: € 1,400.00' in text
+    assert 'Annual Savings from Reduction:      € 290.00' in text
+    assert text.count('Savings for this condition') == 2
+
+
+def test_csv_report_is_the_scenario_table(report_data):
+    rendered = render_report(report_data, 'csv')
+    assert rendered.startswith(b'# cost data: mapping vtest\n')
+    csv = pd.read_csv(io.BytesIO(rendered), skiprows=1)
+    pd.testing.assert_frame_equal(csv, report_data.scenario_df.reset_index(drop=True), check_dtype=False)
+
+
+def test_xlsx_report_sheets(report_data):
+    workbook = openpyxl.load_workbook(io.BytesIO(render_report(report_data, 'xlsx')), read_only=True)
+    assert workbook.sheetnames == ['Summary', 'Base results', 'Scenario', 'Service breakdown']
+    summary = dict(workbook['Summary'].iter_rows(values_only=True))
+    assert summary['Cost data'] == 'mapping vtest'
+    assert summary['Annual savings (€)'] == pytest.approx(290.0)
+    breakdown = list(workbook['Service breakdown'].iter_rows(values_only=True))
+    assert breakdown == [('Condition', 'Service', 'Cost', 'Status'), ('X', 'A', 100.0, 'found'), ('X', 'B', 20.0, 'found'),
+                         ('Y', 'Custom cost per patient', None, 'custom')]
+
+
+def test_service_breakdown_without_a_cost_model(report_data):
+    assert list(iter_service_breakdown(report_data._replace(cost_model=None))) == []
+
+
+@pytest.mark.parametrize('fmt', sorted(REPORT_FORMATS))
+def test_written_files_match_rendered_bytes(report_data, tmp_path, fmt):
+    path = tmp_path / f'report.{REPORT_FORMATS[fmt].extension}'
+    write_report(report_data, fmt, str(path))
+    if fmt == 'xlsx':
+        assert openpyxl.load_workbook(path).sheetnames == ['Summary', 'Base results', 'Scenario', 'Service breakdown']
+    else:
+        assert path.read_bytes() == render_report(report_data, fmt)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scenarios import ScenarioSweep, reduce_patients, reduction_grid, scenario_table
+
+CATEGORIES = {'Mental': ('A', 'B'), 'Physical': ('C',)}
+
+
+def test_grid_overrides_category_then_condition():
+    grid = reduction_grid(['A', 'B', 'C'], [10, 20], per_category={'Mental': 30}, per_condition={'B': [5, 150]},
+                          categories=CATEGORIES)
+    np.testing.assert_array_equal(grid, [[30, 5, 10], [30, 100, 20]])
+
+
+def test_grid_category_values_per_scenario_and_absent_conditions():
+    grid = reduction_grid(['A', 'C'], [0, 50, 100], per_category={'Physical': [1, 2, 3], 'Mental': -10},
+                          categories=CATEGORIES)
+    np.testing.assert_array_equal(grid, [[0, 1], [0, 2], [0, 3]])
+
+
+def test_grid_rejects_unknown_names():
+    with pytest.raises(ValueError, match="Unknown category 'Other'"):
+        reduction_grid(['A'], [10], per_category={'Other': 5}, categories=CATEGORIES)
+    with pytest.raises(ValueError, match="Unknown condition 'D'"):
+        reduction_grid(['A'], [10], per_condition={'D': 5})
+
+
+def test_reduced_patients_are_rounded_and_never_negative():
+    np.testing.assert_array_equal(reduce_patients([3, 7, 1], 50), [2, 4, 0])
+    np.testing.assert_array_equal(reduce_patients([10], 150), [0])
+
+
+def test_sweep_matches_the_scenario_table_at_every_level():
+    results_df = pd.DataFrame({
+        'Condition': ['A', 'B', 'C'],
+        'Patient_Count': [12, 3, 40],
+        'Costs per patient': [120.5, 23.0, 6.25],
+    })
+    results_df['Total societal costs'] = results_df['Patient_Count'] * results_df['Costs per patient']
+    levels = np.arange(0, 101, 5)
+    sweep = ScenarioSweep.from_results(results_df, levels)
+
+    totals = sweep.totals()
+    assert totals['Reduction %'].tolist() == levels.tolist()
+    for k, level in enumerate(levels):
+        table = scenario_table(results_df, level)
+        assert totals['Scenario costs'][k] == pytest.approx(table['Scenario costs'].sum(), abs=1e-9)
+        assert totals['Savings vs base'][k] == pytest.approx(table['Savings vs base'].sum(), abs=1e-9)
+    assert totals['Savings vs base'].iloc[0] == 0
+    assert totals['Scenario costs'].iloc[-1] == 0
+
+    frame = sweep.to_frame()
+    assert len(frame) == len(levels) * 3
+    assert frame['Condition'].tolist()[:4] == ['A', 'B', 'C', 'A']
@@ -0,0 +1,52 @@
+import pytest
+
+from src.condition_mapping import ConditionMapping
+from src.service_index import (MATCH_AMBIGUOUS, MATCH_EXACT, MATCH_MISSING, MATCH_NORMALIZED, ServiceIndex,
+                               build_miss_report, normalize_service_name)
+
+
+@pytest.mark.parametrize('name, normalized', [
+    ('Huisarts  t.m. 20 min', 'huisarts t/m 20 min'),
+    ('Huisarts tot en met 20 min', 'huisarts t/m 20 min'),
+    ('Huisarts t / m 20 min', 'huisarts t/m 20 min'),
+    ('Kosten t.m.s.', 'kosten t.m.s.'),
+    ('Tot en meter', 'tot en meter'),
+    ('Café ( GLI )', 'cafe(gli)'),
+])
+def test_normalize_service_name(name, normalized):
+    assert normalize_service_name(name) == normalized
+
+
+def test_resolution_kinds():
+    index = ServiceIndex(['Fysiotherapie', 'Huisarts t/m 20 min', 'GGZ', 'ggz ', 'Inschrijftarieven', 'Fysiotherapie'])
+    assert len(index) == 5
+    assert index.resolve('Fysiotherapie') == ('Fysiotherapie', 'Fysiotherapie', MATCH_EXACT, ())
+    assert index.resolve(' huisarts T.M. 20 min') == (' huisarts T.M. 20 min', 'Huisarts t/m 20 min', MATCH_NORMALIZED, ())
+
+    ambiguous = index.resolve('Ggz')
+    assert ambiguous.kind == MATCH_AMBIGUOUS and ambiguous.resolved is None
+    assert ambiguous.suggestions == ('GGZ', 'ggz ')
+
+    missing = index.resolve('Inschrijftariexyz')
+    assert missing.kind == MATCH_MISSING and missing.resolved is None
+    assert missing.suggestions == ('Inschrijftarieven',)
+    assert index.resolve('Tandarts').suggestions == ()
+
+
+def test_miss_report_is_empty_when_all_names_match_exactly():
+    index = ServiceIndex(['A', 'B'])
+    assert build_miss_report(index.resolve_all(['A', 'B'])) == ''
+    report = build_miss_report(index.resolve_all(['a', 'C']), {'a': ['X'], 'C': ['Y', 'Z']})
+    assert "'a' matched 'A' after normalizing (used by X)" in report
+    assert "'C' not found (used by Y, Z)" in report
+
+
+def test_mapping_resolution_raises_on_unresolved_services():
+    mapping = ConditionMapping.from_dict({'X': ['a', 'B'], 'Y': ['Missing']}, version='t')
+    index = ServiceIndex(['A', 'B'])
+    with pytest.raises(ValueError, match="'Missing' not found \\(used by Y\\)"):
+        mapping.resolve_services(index)
+
+    matches, report = ConditionMapping.from_dict({'X': ['a', 'B']}).resolve_services(index)
+    assert [match.resolved for match in matches] == ['A', 'B']
+    assert "'a' matched 'A'" in report
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from src.condition_mapping import ConditionMapping
+from src.models import DEFAULT_COST_COLUMN, HealthcareCostModel
+from utils.session_state import CustomCondition, SessionState
+
+
+def other_cost_model():
+    """Shares Y with the small cost model; W is new and X, Z are gone"""
+    df = pd.DataFrame({'codenaam': ['B', 'C', 'D'], DEFAULT_COST_COLUMN: [20.0, 3.0, 7.0]})
+    mapping = ConditionMapping.from_dict({'W': ['D'], 'Y': ['B', 'C']}, version='other')
+    return HealthcareCostModel(df, mapping=mapping)
+
+
+def test_bind_keeps_the_inputs_of_shared_conditions(small_cost_model):
+    state = SessionState()
+    state.bind(small_cost_model)
+    state.patient_counts[state.condition_id('X')] = 5
+    state.patient_counts[state.condition_id('Y')] = 3
+    state.custom_costs[state.condition_id('Y')] = 50.0
+    state.descriptions[state.condition_id('Y')] = "note"
+
+    cost_model = other_cost_model()
+    state.bind(cost_model)
+    assert state.cost_model is cost_model
+    assert state.patient_counts.tolist() == [0, 3]
+    assert state.custom_cost('W') is None
+    assert state.custom_cost('Y') == 50.0
+    assert state.description('Y') == "note"
+
+
+def test_update_results_uses_custom_costs_and_conditions(small_cost_model):
+    state = SessionState()
+    state.bind(small_cost_model)
+    state.patient_counts[state.condition_id('X')] = 2
+    state.patient_counts[state.condition_id('Z')] = 4
+    state.custom_costs[state.condition_id('Z')] = 10.0
+    state.custom_conditions = [CustomCondition("Back pain", patients=1, cost=100.0)]
+
+    assert state.update_results() == {'X', 'Z', ('custom', 0)}
+    assert state.results_df is None
+    state.results_calculated = True
+    assert state.results_df['Total societal costs'].tolist() == [240.0, 40.0, 100.0]
+    assert state.total_cost == 380.0
+    assert state.entered_patients == 7
+    assert state.update_results() == set()
+
+
+def test_reset_clears_the_caseload_but_keeps_custom_costs(small_cost_model):
+    state = SessionState()
+    state.bind(small_cost_model)
+    state.patient_counts[:] = 1
+    state.custom_costs[state.condition_id('X')] = 1.0
+    state.custom_conditions = [CustomCondition("Back pain", patients=1, cost=1.0)]
+    state.update_results()
+    state.results_calculated = True
+
+    state.reset()
+    assert state.entered_patients == 0
+    assert state.results_df is None
+    assert state.custom_cost('X') == 1.0
+    assert np.isnan(state.custom_costs[state.condition_id('Y')])
+
+
+def test_monte_carlo_summary_is_only_current_for_its_inputs(small_cost_model):
+    state = SessionState()
+    state.bind(small_cost_model)
+    state.patient_counts[state.condition_id('X')] = 2
+    state.update_results()
+    key = state.monte_carlo_key(10, 5, 15)
+    state.monte_carlo_summary = pd.DataFrame({'Mean': [1.0]})
+    state.monte_carlo_inputs = key
+    assert state.current_monte_carlo_summary(state.monte_carlo_key(10, 5, 15)) is state.monte_carlo_summary
+    assert state.current_monte_carlo_summary(state.monte_carlo_key(20, 5, 25)) is None
+
+    state.patient_counts[state.condition_id('Y')] = 500
+    state.update_results()
+    assert state.current_monte_carlo_summary(state.monte_carlo_key(10, 5, 15)) is None
+
+    state.bind(other_cost_model())
+    assert state.monte_carlo_summary is None
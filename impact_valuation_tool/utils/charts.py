@@ -0,0 +1,259 @@
+"""
+Plotly figure builders for the results section
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from utils.profiling import timed
+
+
+class ReferenceLine(NamedTuple):
+    """A vertical or horizontal reference line with its annotation text"""
+    value: float
+    label: str
+    dash: str = "dash"
+    width: int = 2
+    color: str = "#ff4d4f"
+
+
+class ChartLimits(NamedTuple):
+    """Point counts above which the charts switch to their large-data mode"""
+    webgl_points: int = 1_000       # draw the scatter with WebGL instead of SVG
+    max_points: int = 5_000         # aggregate the scatter into bins x bins cells
+    bins: int = 50
+    annotation_points: int = 200    # no per-condition labels
+    max_bars: int = 50              # roll the smallest conditions up into one 'Other' bar
+
+
+DEFAULT_CHART_LIMITS = ChartLimits()
+
+
+def _bin_index(values: np.ndarray, bins: int) -> np.ndarray:
+    """Bin of each value over its range; log-spaced when all values are positive"""
+    scaled = np.log10(values) if (values > 0).all() else values
+    low, high = scaled.min(), scaled.max()
+    if high == low:
+        return np.zeros(len(values), dtype=np.int64)
+    return np.minimum(((scaled - low) / (high - low) * bins).astype(np.int64), bins - 1)
+
+
+def bin_points(chart_df: pd.DataFrame, bins: int = 50) -> pd.DataFrame:
+    """One row per non-empty cell of a bins x bins patients/costs grid, at the mean of its conditions.
+
+    The result has the columns of chart_df plus Conditions (count) and Combined costs,
+    and at most bins * bins rows whatever the size of chart_df.
+    """
+    x = chart_df['Patient count'].to_numpy(dtype=float)
+    y = chart_df['Total healthcare costs'].to_numpy(dtype=float)
+    cells = pd.DataFrame({
+        'cell': _bin_index(x, bins) * bins + _bin_index(y, bins),
+        'Condition': chart_df['Condition'].to_numpy(),
+        'Patient count': x,
+        'Costs per patient': chart_df['Costs per patient'].to_numpy(dtype=float),
+        'Total healthcare costs': y,
+    })
+    binned = cells.groupby('cell', sort=False).agg(
+        Condition=('Condition', 'first'),
+        Conditions=('Condition', 'size'),
+        **{
+            'Patient count': ('Patient count', 'mean'),
+            'Costs per patient': ('Costs per patient', 'mean'),
+            'Total healthcare costs': ('Total healthcare costs', 'mean'),
+            'Combined costs': ('Total healthcare costs', 'sum'),
+        }
+    ).reset_index(drop=True)
+    grouped = binned['Conditions'] > 1
+    binned.loc[grouped, 'Condition'] = binned.loc[grouped, 'Conditions'].map(lambda n: f"{n:,} conditions")
+    return binned
+
+
+@timed()
+def build_scatter_figure(chart_df: pd.DataFrame, is_dark: bool = False, x_line: ReferenceLine = None,
+                         y_line: ReferenceLine = None, top_labels: int = 5,
+                         limits: ChartLimits = DEFAULT_CHART_LIMITS) -> go.Figure:
+    """Patients vs. total costs per condition; chart_df has Condition, Patient count, Costs per patient and Total healthcare costs.
+
+    Above limits.webgl_points conditions the points are drawn with WebGL, above
+    limits.max_points they are binned (see bin_points), and above
+    limits.annotation_points the top conditions are no longer labelled, so the figure
+    stays small whatever the number of conditions.
+    """
+    grid_color = 'rgba(255,255,255,0.15)' if is_dark else 'rgba(0,0,0,0.1)'
+    outline_color = '#ffffff' if is_dark else 'rgba(0,0,0,0.35)'
+    n_points = len(chart_df)
+    binned = n_points > limits.max_points
+    plot_df = bin_points(chart_df, limits.bins) if binned else chart_df
+    title = 'Amount of patients per condition vs. total costs per condition'
+    if binned:
+        title += f' ({n_points:,} conditions in {len(plot_df):,} groups)'
+
+    fig_scatter = px.scatter(
+        plot_df,
+        x='Patient count',
+        y='Total healthcare costs',
+        hover_name='Condition',
+        hover_data=({'Conditions': True, 'Combined costs': ':,.0f'} if binned else {})
+        | {'Costs per patient': True, 'Total healthcare costs': True, 'Patient count': True},
+        color='Total healthcare costs',
+        color_continuous_scale='Viridis',
+        size='Conditions' if binned else 'Patient count',
+        size_max=30,
+        render_mode='webgl' if n_points > limits.webgl_points else 'auto',
+        labels={'Patient count': 'Patients', 'Total healthcare costs': 'Costs (€)', 'Condition': 'Condition'},
+        title=title
+    )
+    fig_scatter.update_traces(
+        marker=dict(opacity=0.9, line=dict(width=1, color=outline_color)),
+        selector=dict(mode='markers')
+    )
+    # Bereken en teken referentielijn (x) indien gewenst
+    if x_line is not None:
+        fig_scatter.add_vline(x=x_line.value, line_dash=x_line.dash, line_color=x_line.color, line_width=x_line.width)
+        fig_scatter.add_annotation(
+            x=x_line.value,
+            y=float(chart_df['Total healthcare costs'].max()),
+            text=x_line.label,
+            showarrow=False,
+            yshift=10,
+            font=dict(color=x_line.color)
+        )
+
+    # Bereken en teken horizontale kostenlijn (y) indien gewenst
+    if y_line is not None:
+        fig_scatter.add_hline(y=y_line.value, line_dash=y_line.dash, line_color=y_line.color, line_width=y_line.width)
+        fig_scatter.add_annotation(
+            x=float(chart_df['Patient count'].max()),
+            y=y_line.value,
+            text=y_line.label,
+            showarrow=False,
+            xshift=10,
+            font=dict(color=y_line.color)
+        )
+    # Top-5 labels (op bedrag)
+    if n_points > limits.annotation_points:
+        top_labels = 0
+    top5 = chart_df.nlargest(top_labels, 'Total healthcare costs')
+    for _, r in top5.iterrows():
+        fig_scatter.add_annotation(
+            x=float(r['Patient count']),
+            y=float(r['Total healthcare costs']),
+            text=str(r['Condition']),
+            showarrow=False,
+            yshift=8,
+            font=dict(size=11)
+        )
+    fig_scatter.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        margin=dict(l=10, r=10, t=60, b=10),
+        coloraxis_colorbar=dict(title='Total costs')
+    )
+    fig_scatter.update_xaxes(
+        title_text='Patients per condition',
+        gridcolor=grid_color,
+        zeroline=False,
+        tickmode='auto'
+    )
+    fig_scatter.update_yaxes(
+        title_text='Total costs (€)',
+        gridcolor=grid_color,
+        zeroline=False,
+        tickprefix='€ ',
+        separatethousands=True
+    )
+    return fig_scatter
+
+
+def rollup_bars(chart_df: pd.DataFrame, max_bars: int) -> pd.DataFrame:
+    """The max_bars - 1 costliest conditions plus one 'Other (n conditions)' row with the rest"""
+    if len(chart_df) <= max_bars:
+        return chart_df
+    ranked = chart_df.sort_values('Total healthcare costs', ascending=False)
+    top, rest = ranked.iloc[:max_bars - 1], ranked.iloc[max_bars - 1:]
+    other = pd.DataFrame({'Condition': [f"Other ({len(rest):,} conditions)"],
+                          'Total healthcare costs': [rest['Total healthcare costs'].sum()]})
+    return pd.concat([top[['Condition', 'Total healthcare costs']], other], ignore_index=True)
+
+
+@timed()
+def build_cost_bar_figure(chart_df: pd.DataFrame, limits: ChartLimits = DEFAULT_CHART_LIMITS) -> go.Figure:
+    """Total costs per condition; chart_df has Condition and Total healthcare costs (rolled up above limits.max_bars)"""
+    fig = px.bar(rollup_bars(chart_df, limits.max_bars), x='Condition', y='Total healthcare costs',
+                 title='Healthcare Costs by Condition',
+                 labels={'Total healthcare costs': 'Cost (€)', 'Condition': 'Health Condition'},
+                 color='Total healthcare costs',
+                 color_continuous_scale='Blues')
+    fig.update_layout(xaxis_tickangle=-45,
+                      plot_bgcolor='rgba(0,0,0,0)',
+                      paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame's values, index, column names and dtypes"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Bounded LRU of built figures, keyed on the builder, the chart data's content hash and the options.
+
+    Figures are shared by all sessions and must be treated as read-only: st.plotly_chart
+    copies a figure before serializing it, so passing one on is safe, updating it is not.
+    An unchanged chart yields the same figure and thus the same spec, so Streamlit keeps
+    the element instead of remounting it.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def get(self, builder, chart_df: pd.DataFrame, **options) -> go.Figure:
+        """builder(chart_df, **options), reused when the data and (hashable) options were seen before"""
+        key = (builder.__module__, builder.__qualname__, frame_fingerprint(chart_df), tuple(sorted(options.items())))
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self._stats['hits'] += 1
+                return figure
+            self._stats['misses'] += 1
+
+        figure = builder(chart_df, **options)
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'size': len(self._figures)}
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+# One figure cache per process, shared by all sessions
+_figure_cache = FigureCache()
+
+
+def cached_figure(builder, chart_df: pd.DataFrame, **options) -> go.Figure:
+    """Figure from the process-wide FigureCache"""
+    return _figure_cache.get(builder, chart_df, **options)
+
+
+def get_figure_cache() -> FigureCache:
+    return _figure_cache
@@ -1,11 +1,18 @@
 """
 Streamlit UI components for input handling
 """
+import inspect
+
+import numpy as np
+import pandas as pd
 import streamlit as st
-from src.models import ImpactTool
+from streamlit.errors import StreamlitAPIException
+from src.models import HealthcareCostModel
+from utils.profiling import Profiler
+from utils.session_state import SessionState
 
 
-def render_sidebar(st_session):
+def render_sidebar(state: SessionState, years: list):
     with st.sidebar:
         st.markdown("""
         <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 1.5rem; border-radius: 10px; color: white; margin-bottom: 1.5rem;">
@@ -18,23 +25,32 @@ def render_sidebar(st_session):
         """, unsafe_allow_html=True)
         
         st.markdown("**📊 Data Source**")
-        st.markdown("2024 Dutch healthcare cost data (per capita annual costs)")
+        if state.reference_year not in years:
+            state.reference_year = years[-1]
+        state.reference_year = st.selectbox(
+            "Reference year",
+            years,
+            index=years.index(state.reference_year),
+            key="reference_year",
+            help="Year of the Dutch healthcare cost data used for all calculations"
+        )
+        st.markdown(f"{state.reference_year} Dutch healthcare cost data (per capita annual costs)")
         
         st.markdown("---")
         
         with st.expander("🔍 Methodology Details"):
-            st.markdown("""
+            st.markdown(f"""
             **How calculations work:**
-            - Each health condition has associated annual healthcare costs based on 2024 Dutch data
+            - Each health condition has associated annual healthcare costs based on {state.reference_year} Dutch data
             - Costs are calculated by multiplying the number of patients by the cost per patient
             - Total societal impact represents potential healthcare system savings from preventive interventions
             - Scenario analysis uses prevalence reduction assumptions
             """)
             
         with st.expander("📚 Data Sources"):
-            st.markdown("""
+            st.markdown(f"""
             **Healthcare Cost Data:**
-            - **Source:** 2024 Dutch healthcare insurance data
+            - **Source:** {years[0]}–{years[-1]} Dutch healthcare insurance data ({state.reference_year} selected)
             - **Coverage:** Comprehensive healthcare services including:
               - GP visits & consultations
               - Specialist care
@@ -57,114 +73,194 @@ def render_sidebar(st_session):
         st.markdown("---")
         
         if st.button("🎨 Switch Theme", use_container_width=True):
-            st_session.theme = 'dark' if st_session.theme == 'light' else 'light'
+            state.theme = 'dark' if state.theme == 'light' else 'light'
             st.rerun()
         
-        st.caption(f"Current theme: {st_session.theme.capitalize()}")
+        st.caption(f"Current theme: {state.theme.capitalize()}")
         st.caption("© 2025 Financial Impact Tool\nMade by Séphora, Aslihan, Dinand, Quinn & Karan")
 
 
-def render_patient_input_section(impact_tool: ImpactTool, st_session):
+def performance_panel_requested() -> bool:
+    """The Performance panel is hidden unless the app is opened with ?profile=1"""
+    return st.query_params.get("profile") == "1"
+
+
+def render_performance_panel(profiler: Profiler):
+    """Per-stage timings of the last reruns, with a JSON export"""
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("⏱️ Performance", expanded=True):
+            if not profiler.reruns:
+                st.caption("No reruns recorded yet.")
+                return
+            st.caption(f"Last {len(profiler.reruns)} reruns (of max. {profiler.reruns.maxlen}), in milliseconds")
+            stages = pd.DataFrame(profiler.stage_table()).fillna(0.0)
+            stages = stages[[col for col in stages.columns if col != 'Total'] + ['Total']]
+            st.dataframe(stages.iloc[::-1].style.format("{:.1f}"), use_container_width=True)
+
+            calls = profiler.call_table()
+            if calls:
+                st.markdown("**Timed calls (latest rerun)**")
+                st.dataframe(pd.DataFrame(calls).style.format({'Total ms': "{:.2f}"}), hide_index=True, use_container_width=True)
+
+            lazy_download_button("Download timings (JSON)", profiler.to_json, "rerun_timings.json", "application/json")
+            if st.button("Clear timings", use_container_width=True):
+                profiler.clear()
+                st.rerun()
+
+
+def lazy_download_button(label: str, build, file_name: str, mime: str, help: str = None):
+    """Download button that calls build() for the file contents only when clicked.
+
+    Streamlit versions without deferred downloads get a "Prepare" button first that
+    builds the file and then offers it.
+    """
+    try:
+        return st.download_button(label, data=build, file_name=file_name, mime=mime, help=help, use_container_width=True)
+    except (StreamlitAPIException, RuntimeError):
+        pass
+    if st.button(f"Prepare {file_name}", key=f"prepare_{file_name}", help=help, use_container_width=True):
+        return st.download_button(label, data=build(), file_name=file_name, mime=mime, use_container_width=True)
+
+
+def lazy_expander(label: str, key: str, expanded: bool = False):
+    """Expander whose `.open` tells whether its content is visible (None on Streamlit versions without state tracking)"""
+    try:
+        return st.expander(label, expanded=expanded, key=key, on_change="rerun")
+    except TypeError:
+        return st.expander(label, expanded=expanded)
+
+
+_st_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+# Streamlit versions whose fragments take a key that a widget callback can rerun with st.rerun(key)
+KEYED_FRAGMENTS = _st_fragment is not None and 'key' in inspect.signature(_st_fragment).parameters
+RESULTS_FRAGMENT = 'results'
+
+
+def fragment(key: str = None):
+    """Decorator running a function as a Streamlit fragment (keyed when supported), or as is without fragments"""
+    if _st_fragment is None:
+        return lambda func: func
+    if key is not None and KEYED_FRAGMENTS:
+        return _st_fragment(key=key)
+    return _st_fragment
+
+
+CONDITION_DESCRIPTIONS = {
+    'Burn-Out': 'Physical and mental exhaustion due to prolonged stress at work',
+    'Depression': 'Persistent depressive mood and loss of interest',
+    'Anxiety Disorder': 'Intense anxiety or panic feelings that affect daily life',
+    'Stress': 'Physical and mental response to demands and pressure',
+    'Hernia': 'Protrusion of organs due to a weakened muscle wall, often in the back/abdomen',
+    'RSI': 'Repetitive Strain Injury – pain complaints caused by repetitive movements',
+    'Osteoarthritis': 'Wear-and-tear osteoarthritis – degeneration of joint cartilage',
+    'Cardiovascular diseases': 'Cardiovascular diseases, including heart attack and stroke',
+    'Eating disorder': 'Eating disorder such as anorexia or bulimia',
+    'Type 2 diabetes': 'Diabetes caused by insulin resistance',
+    'Certain cancers': 'Malignant tumors',
+    'High blood pressure': 'Hypertension – high blood pressure',
+    'Sleep apnea': 'Sleep-related breathing disorders',
+    'Narcolepsy': 'Tendency for involuntary daytime sleep episodes',
+    'Restless legs syndrome': 'RLS – restlessness and pain in the legs, especially at night',
+    'Chronic Fatigue': 'ME/CFS – severe fatigue after minimal exertion',
+    'Prevented suicide': 'Prevention of suicide attempts',
+    'Addiction': 'Addiction to substances or behaviors',
+    'Violence': 'Aggressive behavior and violent incidents',
+    'Abuse': 'Abuse – physical, psychological, or sexual'
+}
+
+
+def _store_custom_cost(state: SessionState, condition_id: int, custom_cost: float, default_cost: float):
+    state.custom_costs[condition_id] = custom_cost if abs(custom_cost - default_cost) > 0.01 else np.nan
+
+
+def _on_count_change(state: SessionState, condition_id: int, key: str):
+    """Store the new count and rerun only the results block instead of this category block"""
+    state.patient_counts[condition_id] = st.session_state[key]
+    st.rerun(RESULTS_FRAGMENT)
+
+
+def _on_cost_change(state: SessionState, condition_id: int, key: str, default_cost: float):
+    """Store the new cost per patient and rerun only the results block instead of this category block"""
+    _store_custom_cost(state, condition_id, st.session_state[key], default_cost)
+    st.rerun(RESULTS_FRAGMENT)
+
+
+def _render_category(category: str, conditions: list, cost_model: HealthcareCostModel, state: SessionState):
+    with st.expander(f" {category.upper()}", expanded=False):
+        for condition in conditions:
+            _render_condition(category, condition, cost_model, state)
+
+
+# Each category block is a fragment, so a note only reruns its own block and a count or cost
+# only the results block. Without keyed fragments an input could not refresh the results,
+# so there every edit reruns the page.
+if KEYED_FRAGMENTS:
+    _render_category = fragment()(_render_category)
+
+
+def _render_condition(category: str, condition: str, cost_model: HealthcareCostModel, state: SessionState):
+    condition_id = state.condition_id(condition)
+
+    # Get description
+    description_text = CONDITION_DESCRIPTIONS.get(condition, '')
+
+    st.markdown(f"""
+    <div style="background: linear-gradient(135deg, #667eea15 0%, #764ba215 100%); padding: 1.5rem; border-radius: 12px; border-left: 5px solid #667eea; margin-bottom: 1.5rem;">
+        <h4 style="margin-top: 0; margin-bottom: 0.5rem; color: #667eea;"> {condition}</h4>
+        <p style="margin: 0.5rem 0 1rem 0; color: #666; font-size: 0.9rem;"><em>{description_text}</em></p>
+    """, unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        count_key = f"{category}_{condition}_count"
+        count = st.number_input(
+            f"Patients", 
+            min_value=0, 
+            step=1, 
+            value=int(state.patient_counts[condition_id]),
+            key=count_key,
+            help=f"Enter the number of patients you treat for {condition.lower()}.",
+            on_change=_on_count_change if KEYED_FRAGMENTS else None,
+            args=(state, condition_id, count_key)
+        )
+        state.patient_counts[condition_id] = count
+
+    with col2:
+        default_cost = cost_model.get_cost_per_condition(condition)
+        custom_cost_val = state.custom_costs[condition_id]
+        display_cost = default_cost if np.isnan(custom_cost_val) else float(custom_cost_val)
+        
+        st.caption(f"Default: € {default_cost:,.2f}")
+        cost_key = f"{category}_{condition}_cost_{cost_model.COST_COLUMN}"
+        custom_cost = st.number_input(
+            "Cost per patient (€)",
+            min_value=0.0,
+            step=10.0,
+            value=display_cost,
+            key=cost_key,
+            help="Override the default cost with your own estimate",
+            on_change=_on_cost_change if KEYED_FRAGMENTS else None,
+            args=(state, condition_id, cost_key, default_cost)
+        )
+        _store_custom_cost(state, condition_id, custom_cost, default_cost)
+    
+    description = st.text_area(
+        "Description/Notes",
+        value=state.descriptions[condition_id],
+        key=f"{category}_{condition}_desc",
+        help = "Describe here how your organization addresses this condition or how you, as an organization, make an impact on it.",
+        height=80
+    )
+    state.descriptions[condition_id] = description
+
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("---")
+
+
+def render_patient_input_section(cost_model: HealthcareCostModel, state: SessionState):
     st.markdown('<div class="sub-header"> Enter the number of patients you treat for each specified health condition</div>', unsafe_allow_html=True)
 
-    # Condition descriptions
-    condition_descriptions = {
-        'Burn-Out': 'Physical and mental exhaustion due to prolonged stress at work',
-        'Depression': 'Persistent depressive mood and loss of interest',
-        'Anxiety Disorder': 'Intense anxiety or panic feelings that affect daily life',
-        'Stress': 'Physical and mental response to demands and pressure',
-        'Hernia': 'Protrusion of organs due to a weakened muscle wall, often in the back/abdomen',
-        'RSI': 'Repetitive Strain Injury – pain complaints caused by repetitive movements',
-        'Osteoarthritis': 'Wear-and-tear osteoarthritis – degeneration of joint cartilage',
-        'Cardiovascular diseases': 'Cardiovascular diseases, including heart attack and stroke',
-        'Eating disorder': 'Eating disorder such as anorexia or bulimia',
-        'Type 2 diabetes': 'Diabetes caused by insulin resistance',
-        'Certain cancers': 'Malignant tumors',
-        'High blood pressure': 'Hypertension – high blood pressure',
-        'Sleep apnea': 'Sleep-related breathing disorders',
-        'Narcolepsy': 'Tendency for involuntary daytime sleep episodes',
-        'Restless legs syndrome': 'RLS – restlessness and pain in the legs, especially at night',
-        'Chronic Fatigue': 'ME/CFS – severe fatigue after minimal exertion',
-        'Prevented suicide': 'Prevention of suicide attempts',
-        'Addiction': 'Addiction to substances or behaviors',
-        'Violence': 'Aggressive behavior and violent incidents',
-        'Abuse': 'Abuse – physical, psychological, or sexual'
-    }
-
-    patients_per_condition = {}
-    total_entered_patients = 0
-
-    # Group inputs by category
-    for category, conditions in impact_tool.CATEGORIES.items():
-        with st.expander(f" {category.upper()}", expanded=False):
-            for condition in conditions:
-                # Get description
-                description_text = condition_descriptions.get(condition, '')
-                
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #667eea15 0%, #764ba215 100%); padding: 1.5rem; border-radius: 12px; border-left: 5px solid #667eea; margin-bottom: 1.5rem;">
-                    <h4 style="margin-top: 0; margin-bottom: 0.5rem; color: #667eea;"> {condition}</h4>
-                    <p style="margin: 0.5rem 0 1rem 0; color: #666; font-size: 0.9rem;"><em>{description_text}</em></p>
-                """, unsafe_allow_html=True)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    default_value = st_session.patients_per_condition.get(condition, 0)
-                    count = st.number_input(
-                        f"Patients", 
-                        min_value=0, 
-                        step=1, 
-                        value=default_value, 
-                        key=f"{category}_{condition}_count",
-                        help=f"Enter the number of patients you treat for {condition.lower()}."
-                    )
-                    patients_per_condition[condition] = count
-                    total_entered_patients += count
-                
-                with col2:
-                    if condition not in st_session.condition_details:
-                        default_cost, _ = impact_tool.cost_model.get_cost_per_condition(condition)
-                        st_session.condition_details[condition] = {
-                            "description": "",
-                            "custom_cost": None,
-                            "default_cost": default_cost
-                        }
-                    
-                    if "default_cost" not in st_session.condition_details[condition]:
-                        default_cost, _ = impact_tool.cost_model.get_cost_per_condition(condition)
-                        st_session.condition_details[condition]["default_cost"] = default_cost
-                    
-                    default_cost = st_session.condition_details[condition].get("default_cost", 0.0)
-                    custom_cost_val = st_session.condition_details[condition].get("custom_cost")
-                    display_cost = custom_cost_val if custom_cost_val is not None else default_cost
-                    
-                    st.caption(f"Default: € {default_cost:,.2f}")
-                    custom_cost = st.number_input(
-                        "Cost per patient (€)",
-                        min_value=0.0,
-                        step=10.0,
-                        value=display_cost,
-                        key=f"{category}_{condition}_cost",
-                        help="Override the default cost with your own estimate"
-                    )
-                    if abs(custom_cost - default_cost) > 0.01:
-                        st_session.condition_details[condition]["custom_cost"] = custom_cost
-                    else:
-                        st_session.condition_details[condition]["custom_cost"] = None
-                
-                description = st.text_area(
-                    "Description/Notes",
-                    value=st_session.condition_details[condition].get("description", ""),
-                    key=f"{category}_{condition}_desc",
-                    help = "Describe here how your organization addresses this condition or how you, as an organization, make an impact on it.",
-                    height=80
-                )
-                st_session.condition_details[condition]["description"] = description
-
-                st.markdown("</div>", unsafe_allow_html=True)
-                st.markdown("---")
-
-    st_session.patients_per_condition = patients_per_condition
-    total_patients = total_entered_patients
-    st_session.total_patients = total_patients
-    return total_patients, patients_per_condition, total_entered_patients
+    # Group inputs by category; each category block is its own fragment where supported
+    for category, conditions in cost_model.categories.items():
+        _render_category(category, conditions, cost_model, state)
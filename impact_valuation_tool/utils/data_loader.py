@@ -1,33 +1,315 @@
 """
 Data loading utilities
 """
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 
+from src.models import HealthcareCostModel
+from utils.profiling import timed
+
+COST_SHEET = 'niveau2'
+
+# Cost columns of the zorgcijfersdatabank export, e.g. 'kosten per verzekerde 2024'
+COST_COLUMN_PATTERN = re.compile(r'^kosten (per verzekerde|per gebruiker|totaal) (\d{4})$', re.IGNORECASE)
+
+
+def load_cost_data(filename: str, sheetname: str = COST_SHEET, use_snapshot: bool = True) -> pd.DataFrame:
+    """`codenaam` and every cost column of a sheet, from its snapshot or streamed from the workbook"""
+    if not use_snapshot:
+        return _stream_cost_columns(filename, sheetname)[1]
+
+    matrix_path, meta_path = _snapshot_paths(filename, f"{sheetname}.costs")
+    df = _read_snapshot(filename, matrix_path, meta_path)
+    if df is None:
+        header, df = _stream_cost_columns(filename, sheetname)
+        _write_snapshot(df, filename, matrix_path, meta_path, extra_meta={'header': header})
+    return df
+
+
+def read_cost_columns(filename: str, sheetname: str = COST_SHEET, columns: list = None) -> pd.DataFrame:
+    """Stream `codenaam` plus the given cost columns (default: all of them) from a workbook"""
+    return _stream_cost_columns(filename, sheetname, columns)[1]
+
+
+def _stream_cost_columns(filename: str, sheetname: str, columns: list = None) -> tuple[list, pd.DataFrame]:
+    """Full header and a DataFrame of the selected columns, reading only those cells row by row.
+
+    Uses openpyxl's read-only mode, so the sheet is never held in memory as a whole,
+    and parses cost cells with parse_number instead of a string round-trip. Rows
+    without a `codenaam` are skipped.
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheetname].iter_rows(values_only=True)
+        header = [value for value in next(rows, ()) if value is not None]
+        if columns is None:
+            columns = list(find_cost_columns(header).values())
+        missing = [col for col in ['codenaam'] + list(columns) if col not in header]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in sheet '{sheetname}'. Available: {header}")
+
+        name_position = header.index('codenaam')
+        positions = [header.index(col) for col in columns]
+        names = []
+        values = [[] for _ in columns]
+        for row in rows:
+            name = row[name_position] if name_position < len(row) else None
+            if name is None:
+                continue
+            names.append(str(name))
+            for position, column_values in zip(positions, values):
+                column_values.append(parse_number(row[position]) if position < len(row) else np.nan)
+    finally:
+        workbook.close()
+
+    data = {'codenaam': names}
+    data.update({col: np.array(column_values, dtype='float64') for col, column_values in zip(columns, values)})
+    return header, pd.DataFrame(data, columns=['codenaam'] + list(columns))
+
+
+def parse_number(value) -> float:
+    """Cell value as a float; NaN when empty or not a number.
 
-def load_data(filename: str, sheetname: str) -> pd.DataFrame:
-    df = pd.read_excel(filename, sheetname)
+    Text is accepted in Dutch notation ('1.234,56', '12,5') as well as English
+    ('1,234.56'), with optional euro sign and spaces. With both separators present the
+    last one is the decimal separator; a lone comma is a decimal comma.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return np.nan
+
+    text = value.replace('€', '').replace('\xa0', '').replace(' ', '').strip()
+    if ',' in text and '.' in text:
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif text.count(',') == 1:
+        text = text.replace(',', '.')
+    elif text.count(',') > 1:
+        text = text.replace(',', '')
+    elif text.count('.') > 1:
+        text = text.replace('.', '')
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def read_sheet_header(filename: str, sheetname: str) -> list:
+    """Column names of a sheet, from a fresh cost snapshot or else the first row only, without loading the data"""
+    _, meta_path = _snapshot_paths(filename, f"{sheetname}.costs")
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source') == _source_identity(filename):
+            return meta['header']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        header = next(workbook[sheetname].iter_rows(max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    return [value for value in header if value is not None]
+
+
+def find_cost_columns(columns) -> dict:
+    """Map (year, metric) to the cost column holding it, e.g. (2024, 'per verzekerde') -> 'kosten per verzekerde 2024'"""
+    cost_columns = {}
+    for column in columns:
+        match = COST_COLUMN_PATTERN.match(str(column).strip())
+        if match:
+            cost_columns[(int(match.group(2)), match.group(1).lower())] = column
+    return cost_columns
+
+
+def default_cost_column(cost_columns: dict) -> str:
+    """Latest year of the costs per insured person, or of any metric when that one is missing"""
+    per_insured = [key for key in cost_columns if key[1] == 'per verzekerde']
+    return cost_columns[max(per_insured or cost_columns)]
+
+
+def _snapshot_paths(filename: str, sheetname: str) -> tuple[str, str]:
+    base = f"{os.path.splitext(filename)[0]}.{sheetname}.snapshot"
+    return base + '.npy', base + '.json'
+
+
+def _source_identity(filename: str) -> list:
+    stat = os.stat(filename)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_snapshot(filename: str, matrix_path: str, meta_path: str):
+    """Load the sidecar of a sheet, or None when it is missing or older than the workbook"""
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source') != _source_identity(filename):
+            return None
+        matrix = np.load(matrix_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    data = {col: matrix[:, i] for i, col in enumerate(meta['numeric'])}
+    data.update(meta['text'])
+    df = pd.DataFrame(data, columns=meta['columns'])
+    for col, dtype in meta['dtypes'].items():
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
     return df
 
 
+def _write_snapshot(df: pd.DataFrame, filename: str, matrix_path: str, meta_path: str, extra_meta: dict = None):
+    """Store numeric columns as one float64 .npy matrix and everything else as JSON next to the workbook"""
+    if not all(isinstance(col, str) for col in df.columns):
+        return
+
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    text = {
+        col: [None if pd.isna(value) else value for value in df[col].tolist()]
+        for col in df.columns if col not in numeric
+    }
+    meta = {
+        'source': _source_identity(filename),
+        'columns': list(df.columns),
+        'numeric': numeric,
+        'dtypes': {col: str(df[col].dtype) for col in numeric},
+        'text': text,
+        **(extra_meta or {}),
+    }
+
+    # Write to temporary files and rename, so concurrent workers never read half a snapshot
+    pid = os.getpid()
+    try:
+        meta_json = json.dumps(meta)
+        with open(f"{matrix_path}.{pid}.tmp", 'wb') as f:
+            np.save(f, np.asfortranarray(df[numeric].to_numpy(dtype='float64')))
+        with open(f"{meta_path}.{pid}.tmp", 'w', encoding='utf-8') as f:
+            f.write(meta_json)
+        os.replace(f"{matrix_path}.{pid}.tmp", matrix_path)
+        os.replace(f"{meta_path}.{pid}.tmp", meta_path)
+    except (OSError, TypeError, ValueError):
+        # Cells that JSON cannot represent (e.g. dates) or a read-only directory: keep using Excel
+        for tmp in (f"{matrix_path}.{pid}.tmp", f"{meta_path}.{pid}.tmp"):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+@timed()
 def load_and_prepare_healthcare_data(filepath: str) -> pd.DataFrame:
-    import os
-    
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Data file '{filepath}' not found in the current directory.")
-    
-    master_costs_df = load_data(filepath, 'niveau2')
-    
-    COST_COLUMN_NAME = 'kosten per verzekerde 2024'
-    alternative_columns = ['kosten per gebruiker 2024', 'kosten per gebruiker', 'Kosten per gebruiker 2024', 'Kosten per gebruiker']
-    for col in alternative_columns:
-        if col in master_costs_df.columns:
-            COST_COLUMN_NAME = col
-            break
-    
-    if COST_COLUMN_NAME not in master_costs_df.columns:
-        raise ValueError(f"Cost column not found. Tried: {alternative_columns}. Available: {master_costs_df.columns.tolist()}")
-    
-    master_costs_df[COST_COLUMN_NAME] = master_costs_df[COST_COLUMN_NAME].astype(str)
-    master_costs_df[COST_COLUMN_NAME] = pd.to_numeric(master_costs_df[COST_COLUMN_NAME], errors='coerce').fillna(0.0)
-    
+
+    master_costs_df = load_cost_data(filepath, COST_SHEET)
+
+    cost_columns = find_cost_columns(master_costs_df.columns)
+    if not cost_columns:
+        raise ValueError(f"No cost columns found (expected e.g. 'kosten per verzekerde 2024'). Available: {master_costs_df.columns.tolist()}")
+
+    # Cost cells are already parsed to numbers; blanks and unparseable text count as no cost
+    for col in cost_columns.values():
+        master_costs_df[col] = master_costs_df[col].fillna(0.0)
+
     return master_costs_df
+
+
+class DatasetVersion(NamedTuple):
+    """The workbook content a dataset was loaded from"""
+    source: str
+    content_hash: str
+    modified: pd.Timestamp
+
+    @property
+    def label(self) -> str:
+        return f"{os.path.basename(self.source)} of {self.modified:%Y-%m-%d %H:%M} ({self.content_hash[:8]})"
+
+
+class CachedDataset(NamedTuple):
+    """Prepared cost data and cost model shared by all sessions.
+
+    The prepared frame itself is kept private to the cache; costs_df hands out a copy,
+    so a caller changing it cannot corrupt what every other session reads.
+    """
+    shared_costs_df: pd.DataFrame
+    cost_model: HealthcareCostModel
+    content_hash: str
+    version: DatasetVersion
+
+    @property
+    def costs_df(self) -> pd.DataFrame:
+        return self.shared_costs_df.copy()
+
+
+# Process-wide cache: one entry per resolved path. Streamlit re-executes app.py on
+# every rerun but imported modules stay loaded, so all sessions share these entries.
+_dataset_cache = {}
+_dataset_cache_stats = {'hits': 0, 'misses': 0}
+_dataset_cache_lock = threading.Lock()
+
+
+def _file_stat_key(filepath: str) -> tuple:
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_content_hash(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_cached_dataset(filepath: str) -> CachedDataset:
+    """Return the prepared data and cost model for filepath, parsing the workbook only when it changed"""
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Data file '{filepath}' not found in the current directory.")
+
+    path_key = os.path.realpath(filepath)
+    stat_key = _file_stat_key(path_key)
+
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(path_key)
+        if entry is not None and entry[0] == stat_key:
+            _dataset_cache_stats['hits'] += 1
+            return entry[1]
+
+        # mtime/size changed (or first load): only re-parse if the content really differs
+        content_hash = _file_content_hash(path_key)
+        if entry is not None and entry[1].content_hash == content_hash:
+            _dataset_cache[path_key] = (stat_key, entry[1])
+            _dataset_cache_stats['hits'] += 1
+            return entry[1]
+
+        _dataset_cache_stats['misses'] += 1
+        version = DatasetVersion(path_key, content_hash, pd.Timestamp.fromtimestamp(stat_key[0] / 1e9))
+        costs_df = load_and_prepare_healthcare_data(path_key)
+        cost_model = HealthcareCostModel(costs_df, default_cost_column(find_cost_columns(costs_df.columns)),
+                                         dataset_version=version)
+        dataset = CachedDataset(costs_df, cost_model, content_hash, version)
+        _dataset_cache[path_key] = (stat_key, dataset)
+        return dataset
+
+
+def get_dataset_cache_stats() -> dict:
+    with _dataset_cache_lock:
+        return {**_dataset_cache_stats, 'entries': len(_dataset_cache)}
+
+
+def clear_dataset_cache():
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+        _dataset_cache_stats['hits'] = 0
+        _dataset_cache_stats['misses'] = 0
@@ -0,0 +1,229 @@
+"""
+Registry of the cost years and metrics available in one or more workbooks
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from src.condition_mapping import load_condition_mapping
+from src.models import HealthcareCostModel
+from utils.data_loader import COST_SHEET, find_cost_columns, get_cached_dataset, read_sheet_header
+from utils.profiling import timed
+
+DEFAULT_METRIC = 'per verzekerde'
+DEFAULT_WATCH_INTERVAL = 5.0
+
+
+class CostColumn(NamedTuple):
+    """One selectable cost vector: a metric for a year in a workbook column"""
+    year: int
+    metric: str
+    column: str
+    source: str
+
+
+class DatasetRegistry:
+    """Index of all year/metric cost columns, with cost models built on first use.
+
+    Only the sheet headers are read to build the index. The workbook itself is loaded
+    (once, through get_cached_dataset) when a year is first requested, and the cost
+    model of each requested column is kept in a bounded LRU, so switching back to a
+    recent year costs nothing. When the same year and metric appear in several
+    workbooks, the last workbook wins.
+
+    Without a watcher, a changed workbook or condition mapping is picked up on the
+    next call, by that call. After watch(), calls only read the current snapshot and
+    a DatasetWatcher thread reloads changes in the background (see reload()).
+    """
+
+    def __init__(self, workbooks, max_loaded: int = 4):
+        self.workbooks = [os.path.realpath(path) for path in ([workbooks] if isinstance(workbooks, str) else workbooks)]
+        self.max_loaded = max_loaded
+        self._columns = {}
+        self._stat_keys = None
+        self._datasets = {}
+        self._mapping = None
+        # (year, metric) -> (source, content hash, column, mapping) key and its cost model, least recently used first
+        self._models = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.watcher = None
+
+    def _current_stat_keys(self) -> list:
+        stat_keys = []
+        for path in self.workbooks:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Data file '{path}' not found.")
+            stat = os.stat(path)
+            stat_keys.append((stat.st_mtime_ns, stat.st_size))
+        return stat_keys
+
+    def _read_index(self) -> dict:
+        columns = {}
+        for path in self.workbooks:
+            for (year, metric), column in find_cost_columns(read_sheet_header(path, COST_SHEET)).items():
+                columns[(year, metric)] = CostColumn(year, metric, column, path)
+        return columns
+
+    def _sync(self):
+        """Pick up changed files on the calling thread, unless a watcher does it (call with the lock held)"""
+        if self.watcher is not None:
+            return
+        self._mapping = load_condition_mapping()
+        stat_keys = self._current_stat_keys()
+        if stat_keys != self._stat_keys:
+            self._columns = self._read_index()
+            self._stat_keys = stat_keys
+            self._datasets = {}
+
+    def available(self) -> list:
+        """All indexed cost columns, sorted by metric and year"""
+        with self._lock:
+            self._sync()
+            return [self._columns[key] for key in sorted(self._columns, key=lambda key: (key[1], key[0]))]
+
+    def metrics(self) -> list:
+        return list(dict.fromkeys(entry.metric for entry in self.available()))
+
+    def years(self, metric: str = DEFAULT_METRIC) -> list:
+        return [entry.year for entry in self.available() if entry.metric == metric]
+
+    def default_year(self, metric: str = DEFAULT_METRIC) -> int:
+        """Latest year available for `metric`"""
+        years = self.years(metric)
+        if not years:
+            raise ValueError(f"No '{metric}' cost columns found. Available metrics: {self.metrics()}")
+        return years[-1]
+
+    @timed('DatasetRegistry.get_cost_model')
+    def get_cost_model(self, year: int = None, metric: str = DEFAULT_METRIC) -> HealthcareCostModel:
+        """Cost model for one year and metric (default: the default year), built on first use"""
+        if year is None:
+            year = self.default_year(metric)
+        with self._lock:
+            self._sync()
+            entry = self._columns.get((year, metric))
+            if entry is None:
+                available = sorted(key for key in self._columns if key[1] == metric)
+                raise ValueError(f"No '{metric}' costs for {year}. Available years: {[key[0] for key in available]}")
+
+            dataset = self._datasets.get(entry.source)
+            if dataset is None:
+                dataset = get_cached_dataset(entry.source)
+                self._datasets[entry.source] = dataset
+            key = (entry.source, dataset.content_hash, entry.column, self._mapping)
+            cached = self._models.get((year, metric))
+            if cached is not None and cached[0] == key:
+                self._models.move_to_end((year, metric))
+                self._stats['hits'] += 1
+                return cached[1]
+
+            self._stats['misses'] += 1
+            cost_model = _build_cost_model(entry, dataset, self._mapping)
+            self._models[(year, metric)] = (key, cost_model)
+            self._models.move_to_end((year, metric))
+            while len(self._models) > self.max_loaded:
+                self._models.popitem(last=False)
+            return cost_model
+
+    def reload(self) -> bool:
+        """Load changed workbooks or mapping off the request path and swap them in at once.
+
+        The new index, datasets and the cost models of the recently used columns are
+        built without holding the registry lock, so requests keep getting the current
+        models meanwhile; then all of them replace the old ones in one step. A session
+        that already holds a model finishes its rerun on it, the next rerun gets the
+        new one. On an error (e.g. a workbook still being written) nothing is swapped.
+        Returns whether anything changed.
+        """
+        with self._reload_lock:
+            stat_keys = self._current_stat_keys()
+            mapping = load_condition_mapping()
+            with self._lock:
+                if stat_keys == self._stat_keys and mapping is self._mapping:
+                    return False
+                recent = list(self._models)
+
+            columns = self._read_index()
+            datasets = {}
+            models = OrderedDict()
+            for year_metric in recent:
+                entry = columns.get(year_metric)
+                if entry is None:
+                    continue
+                if entry.source not in datasets:
+                    datasets[entry.source] = get_cached_dataset(entry.source)
+                dataset = datasets[entry.source]
+                key = (entry.source, dataset.content_hash, entry.column, mapping)
+                models[year_metric] = (key, _build_cost_model(entry, dataset, mapping))
+
+            with self._lock:
+                self._columns, self._stat_keys, self._datasets, self._mapping, self._models = (
+                    columns, stat_keys, datasets, mapping, models)
+                self._stats['reloads'] += 1
+            return True
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL) -> 'DatasetWatcher':
+        """Start reloading changes in a background thread (once; later calls return the running watcher)"""
+        with self._lock:
+            if self.watcher is None:
+                self._sync()
+                self.watcher = DatasetWatcher(self, interval)
+                self.watcher.start()
+            return self.watcher
+
+    def stop_watching(self):
+        with self._lock:
+            watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'loaded': len(self._models)}
+
+
+def _build_cost_model(entry: CostColumn, dataset, mapping) -> HealthcareCostModel:
+    """Cost model of one column, reusing the dataset's default model when it matches"""
+    if dataset.cost_model.COST_COLUMN == entry.column and dataset.cost_model.mapping is mapping:
+        return dataset.cost_model
+    return HealthcareCostModel(dataset.costs_df, entry.column, mapping, dataset.version)
+
+
+class DatasetWatcher(threading.Thread):
+    """Daemon thread calling registry.reload() every `interval` seconds; last_error holds the latest failure"""
+
+    def __init__(self, registry: DatasetRegistry, interval: float = DEFAULT_WATCH_INTERVAL):
+        super().__init__(name='dataset-watcher', daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.last_error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.registry.reload()
+                self.last_error = None
+            except Exception as e:  # retried on the next poll
+                self.last_error = e
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# One registry per set of workbooks, shared by all sessions
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_dataset_registry(*workbooks: str, max_loaded: int = 4) -> DatasetRegistry:
+    key = (tuple(os.path.realpath(path) for path in workbooks), max_loaded)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = DatasetRegistry(list(workbooks), max_loaded)
+            _registries[key] = registry
+        return registry
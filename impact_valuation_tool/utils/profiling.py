@@ -0,0 +1,149 @@
+"""
+Lightweight timing spans for app reruns
+
+A Profiler records the stages of one rerun (`stage`) and any timed functions called
+during them (`span` / `timed`) while it is active on the current thread. When no
+profiler is active, `stage`, `span` and `timed` functions cost one thread-local lookup.
+"""
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+_active = threading.local()
+_NULL_SPAN = nullcontext()
+
+
+class Profiler:
+    """Timing spans of the last `history` reruns of one session.
+
+    Each rerun is a dict with its start time, total and spans; a span is a dict with
+    name, depth (0 = top-level stage), start and duration in milliseconds relative to
+    the start of the rerun.
+    """
+
+    def __init__(self, history: int = 20):
+        self.enabled = False
+        self.reruns = deque(maxlen=history)
+        self._spans = None
+        self._start = 0.0
+        self._depth = 0
+        self._stage = None
+
+    @contextmanager
+    def rerun(self, label: str = 'rerun'):
+        """Record the spans of one rerun while the block runs (does nothing when disabled)"""
+        if not self.enabled:
+            yield self
+            return
+        started_at = time.time()
+        self._spans = []
+        self._depth = 0
+        self._stage = None
+        self._start = time.perf_counter()
+        _active.profiler = self
+        try:
+            yield self
+        finally:
+            _active.profiler = None
+            now = time.perf_counter()
+            self._close_stage(now)
+            self.reruns.append({
+                'label': label,
+                'started_at': started_at,
+                'total_ms': (now - self._start) * 1000,
+                'spans': self._spans,
+            })
+            self._spans = None
+
+    def checkpoint(self, name: str):
+        """End the current stage and start the next one"""
+        now = time.perf_counter()
+        self._close_stage(now)
+        self._stage = (name, now)
+
+    def _close_stage(self, now: float):
+        if self._stage is not None:
+            name, start = self._stage
+            self._record(name, 0, start, now)
+            self._stage = None
+
+    def _record(self, name: str, depth: int, start: float, end: float):
+        self._spans.append({
+            'name': name,
+            'depth': depth,
+            'start_ms': (start - self._start) * 1000,
+            'duration_ms': (end - start) * 1000,
+        })
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block nested in the current stage"""
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, self._depth, start, time.perf_counter())
+            self._depth -= 1
+
+    def stage_table(self) -> list:
+        """One {stage: ms} row per recorded rerun, oldest first, with a 'Total' column"""
+        rows = []
+        for rerun in self.reruns:
+            row = {}
+            for span in rerun['spans']:
+                if span['depth'] == 0:
+                    row[span['name']] = row.get(span['name'], 0.0) + span['duration_ms']
+            row['Total'] = rerun['total_ms']
+            rows.append(row)
+        return rows
+
+    def call_table(self) -> list:
+        """Calls and total ms of every nested span in the latest rerun, slowest first"""
+        if not self.reruns:
+            return []
+        calls = {}
+        for span in self.reruns[-1]['spans']:
+            if span['depth'] > 0:
+                count, total = calls.get(span['name'], (0, 0.0))
+                calls[span['name']] = (count + 1, total + span['duration_ms'])
+        return sorted(({'Span': name, 'Calls': count, 'Total ms': total} for name, (count, total) in calls.items()),
+                      key=lambda row: row['Total ms'], reverse=True)
+
+    def to_json(self) -> str:
+        return json.dumps({'reruns': list(self.reruns)}, indent=2)
+
+    def clear(self):
+        self.reruns.clear()
+
+
+def stage(name: str):
+    """Start the next top-level stage of the active rerun"""
+    profiler = getattr(_active, 'profiler', None)
+    if profiler is not None:
+        profiler.checkpoint(name)
+
+
+def span(name: str):
+    """Context manager timing a block in the active rerun"""
+    profiler = getattr(_active, 'profiler', None)
+    return _NULL_SPAN if profiler is None else profiler.span(name)
+
+
+def timed(name: str = None):
+    """Decorator recording every call of a function as a span of the active rerun"""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = getattr(_active, 'profiler', None)
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,186 @@
+"""
+Downloadable reports of the base calculation and scenario
+
+Every format is written row by row to a text or binary stream, so a report can go
+straight to a download buffer or a file without first being assembled as a string.
+"""
+import io
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.models import SERVICE_FOUND, HealthcareCostModel
+from utils.profiling import timed
+
+BASE_COLUMNS = ['Condition', 'Patient_Count', 'Costs per patient', 'Total societal costs']
+SCENARIO_COLUMNS = ['Condition', 'Patient count', 'Reduced patients', 'Costs per patient', 'Total healthcare costs',
+                    'Scenario costs', 'Savings vs base']
+
+
+class ReportData(NamedTuple):
+    """The inputs of one report.
+
+    results_df holds the ImpactTool results and scenario_df the scenario_table of them;
+    the per-service breakdown is read from cost_model for every condition in results_df
+    that it knows, except those in custom_cost_conditions.
+    """
+    entered_patients: int
+    total_cost: float
+    scenario_pct: float
+    results_df: pd.DataFrame
+    scenario_df: pd.DataFrame
+    cost_model: HealthcareCostModel = None
+    custom_cost_conditions: frozenset = frozenset()
+    generated_at: pd.Timestamp = None
+
+
+class ReportFormat(NamedTuple):
+    """A report writer with the file details of its output"""
+    write: Callable
+    extension: str
+    mime: str
+    binary: bool
+
+
+def _generated_at(data: ReportData) -> pd.Timestamp:
+    return pd.Timestamp.now() if data.generated_at is None else data.generated_at
+
+
+def _cost_data_version(data: ReportData) -> str:
+    return 'unknown' if data.cost_model is None else data.cost_model.version_label
+
+
+def write_text_report(data: ReportData, out):
+    """Plain-text summary of the base costs and the prevalence reduction scenario"""
+    scenario_df = data.scenario_df
+    out.write(f"""
+FINANCIAL IMPACT ANALYSIS REPORT
+{'='*60}
+Generated: {_generated_at(data).strftime('%Y-%m-%d %H:%M:%S')}
+Cost data: {_cost_data_version(data)}
+
+BASE CALCULATION
+{'='*60}
+Total patients entered: {data.entered_patients}
+Total Annual Societal Healthcare Costs: € {data.total_cost:,.2f}
+
+SCENARIO ANALYSIS: Prevalence Reduction
+{'='*60}
+Reduction percentage: {data.scenario_pct}%
+
+Cost Summary:
+  Base Costs (Current Situation):     € {data.total_cost:,.2f}
+  Scenario Costs (With Reduction):    € {scenario_df['Scenario costs'].sum():,.2f}
+  Annual Savings from Reduction:      € {scenario_df['Savings vs base'].sum():,.2f}
+
+DETAILED BREAKDOWN BY CONDITION
+{'='*60}
+""")
+    rows = scenario_df[SCENARIO_COLUMNS].itertuples(index=False, name=None)
+    for condition, patients, reduced, cost, total, scenario_cost, savings in rows:
+        out.write(
+            f"\n{condition}\n"
+            f"  Patients (base):        {patients}\n"
+            f"  Patients (scenario):    {reduced}\n"
+            f"  Cost per patient:       € {cost:,.2f}\n"
+            f"  Total cost (base):      € {total:,.2f}\n"
+            f"  Scenario cost:          € {scenario_cost:,.2f}\n"
+            f"  Savings for this condition: € {savings:,.2f}\n"
+        )
+
+
+def write_csv_report(data: ReportData, out):
+    """The scenario table as CSV, after a `# cost data: <version>` comment line"""
+    out.write(f"# cost data: {_cost_data_version(data)}\n")
+    data.scenario_df.to_csv(out, index=False)
+
+
+def iter_service_breakdown(data: ReportData):
+    """(Condition, Service, Cost, Status) rows for the conditions of a report, one condition at a time"""
+    if data.cost_model is None:
+        return
+    for condition in data.results_df['Condition']:
+        if condition not in data.cost_model.condition_index:
+            continue
+        if condition in data.custom_cost_conditions:
+            yield condition, 'Custom cost per patient', None, 'custom'
+            continue
+        for service, cost, status in data.cost_model.get_cost_breakdown(condition).itertuples(index=False):
+            yield condition, service, float(cost) if status == SERVICE_FOUND else None, status
+
+
+def _cell(value):
+    """A value openpyxl can write: NumPy scalars as Python numbers, NaN as an empty cell"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_xlsx_report(data: ReportData, out):
+    """Workbook with Summary, Base results, Scenario and Service breakdown sheets"""
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    scenario_df = data.scenario_df
+
+    summary = workbook.create_sheet('Summary')
+    for row in (
+        ('Generated', _generated_at(data).strftime('%Y-%m-%d %H:%M:%S')),
+        ('Cost data', _cost_data_version(data)),
+        ('Total patients entered', data.entered_patients),
+        ('Total annual healthcare costs (€)', data.total_cost),
+        ('Reduction percentage', data.scenario_pct),
+        ('Scenario costs (€)', scenario_df['Scenario costs'].sum()),
+        ('Annual savings (€)', scenario_df['Savings vs base'].sum()),
+    ):
+        summary.append([_cell(value) for value in row])
+
+    for title, df, columns, header in (
+        ('Base results', data.results_df, BASE_COLUMNS, ['Condition', 'Patients', 'Costs per patient', 'Total healthcare costs']),
+        ('Scenario', scenario_df, SCENARIO_COLUMNS, SCENARIO_COLUMNS),
+    ):
+        sheet = workbook.create_sheet(title)
+        sheet.append(header)
+        for row in df[columns].itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+
+    breakdown = workbook.create_sheet('Service breakdown')
+    breakdown.append(['Condition', 'Service', 'Cost', 'Status'])
+    for row in iter_service_breakdown(data):
+        breakdown.append([_cell(value) for value in row])
+
+    workbook.save(out)
+
+
+REPORT_FORMATS = {
+    'txt': ReportFormat(write_text_report, 'txt', 'text/plain', binary=False),
+    'csv': ReportFormat(write_csv_report, 'csv', 'text/csv', binary=False),
+    'xlsx': ReportFormat(write_xlsx_report, 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', binary=True),
+}
+
+
+@timed()
+def render_report(data: ReportData, fmt: str) -> bytes:
+    """A report in one of REPORT_FORMATS as bytes, e.g. for a download"""
+    report_format = REPORT_FORMATS[fmt]
+    buffer = io.BytesIO()
+    if report_format.binary:
+        report_format.write(data, buffer)
+    else:
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+        report_format.write(data, text)
+        text.detach()
+    return buffer.getvalue()
+
+
+def write_report(data: ReportData, fmt: str, path: str):
+    """Stream a report in one of REPORT_FORMATS to a file"""
+    report_format = REPORT_FORMATS[fmt]
+    if report_format.binary:
+        with open(path, 'wb') as f:
+            report_format.write(data, f)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            report_format.write(data, f)
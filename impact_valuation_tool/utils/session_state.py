@@ -0,0 +1,166 @@
+"""
+Typed per-session state of the Streamlit app
+"""
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.incremental import IncrementalCalculator
+from src.models import HealthcareCostModel
+from utils.profiling import Profiler
+
+
+class CustomCondition:
+    """A condition entered by hand, outside the cost model"""
+    __slots__ = ('name', 'description', 'patients', 'cost')
+
+    def __init__(self, name: str = "", description: str = "", patients: int = 0, cost: float = 0.0):
+        self.name = name
+        self.description = description
+        self.patients = patients
+        self.cost = cost
+
+
+class SessionState:
+    """Everything one user session keeps between reruns.
+
+    Patient counts, custom costs (NaN = use the model default) and notes of the
+    predefined conditions are arrays indexed by the cost model's condition id. The
+    condition list and index are shared with the cost model, not copied. Results are
+    kept once, by the incremental calculator; scenario tables are derived from them
+    when displayed instead of being stored. The Monte Carlo summary is kept with the
+    inputs it was simulated from (monte_carlo_key) and only shown while they match.
+    """
+    __slots__ = ('theme', 'reference_year', 'cost_model', 'patient_counts', 'custom_costs', 'descriptions', 'custom_conditions',
+                 'results_calculated', 'calculator', 'monte_carlo_summary', 'monte_carlo_inputs', 'profiler')
+
+    def __init__(self, theme: str = 'light'):
+        self.theme = theme
+        self.reference_year = None
+        self.cost_model = None
+        self.patient_counts = np.zeros(0, dtype=np.int64)
+        self.custom_costs = np.zeros(0)
+        self.descriptions = np.zeros(0, dtype=object)
+        self.custom_conditions = []
+        self.results_calculated = False
+        self.calculator = None
+        self.monte_carlo_summary = None
+        self.monte_carlo_inputs = None
+        self.profiler = Profiler()
+
+    def bind(self, cost_model: HealthcareCostModel):
+        """Size the per-condition arrays for a cost model, keeping the inputs of conditions it shares with the previous one"""
+        if cost_model is self.cost_model:
+            return
+        n_conditions = len(cost_model.conditions)
+        patient_counts = np.zeros(n_conditions, dtype=np.int64)
+        custom_costs = np.full(n_conditions, np.nan)
+        descriptions = np.full(n_conditions, "", dtype=object)
+        if self.cost_model is not None:
+            for condition, old_id in self.cost_model.condition_index.items():
+                new_id = cost_model.condition_index.get(condition)
+                if new_id is not None:
+                    patient_counts[new_id] = self.patient_counts[old_id]
+                    custom_costs[new_id] = self.custom_costs[old_id]
+                    descriptions[new_id] = self.descriptions[old_id]
+        self.cost_model = cost_model
+        self.patient_counts = patient_counts
+        self.custom_costs = custom_costs
+        self.descriptions = descriptions
+        self.calculator = None
+        self.monte_carlo_summary = None
+        self.monte_carlo_inputs = None
+
+    def reset(self):
+        """Clear the caseload and results, keeping the theme, reference year, custom costs and notes"""
+        self.patient_counts[:] = 0
+        self.custom_conditions = []
+        self.results_calculated = False
+        self.calculator = None
+        self.monte_carlo_summary = None
+        self.monte_carlo_inputs = None
+
+    def condition_id(self, condition: str) -> int:
+        return self.cost_model.condition_index[condition]
+
+    def custom_cost(self, condition: str):
+        """Custom cost per patient of a predefined condition, or None when it uses the model default"""
+        cost = self.custom_costs[self.condition_id(condition)]
+        return None if np.isnan(cost) else float(cost)
+
+    def description(self, condition: str) -> str:
+        return self.descriptions[self.condition_id(condition)]
+
+    @property
+    def entered_patients(self) -> int:
+        """Patients over all predefined and custom conditions"""
+        total = int(self.patient_counts.sum())
+        for cond in self.custom_conditions:
+            try:
+                total += int(cond.patients)
+            except (TypeError, ValueError):
+                pass
+        return total
+
+    def update_results(self) -> set:
+        """Bring the results up to date with the inputs; returns the keys of the changed rows"""
+        if self.calculator is None or self.calculator.cost_model is not self.cost_model:
+            self.calculator = IncrementalCalculator(self.cost_model)
+        patients_per_condition = dict(zip(self.cost_model.conditions, self.patient_counts.tolist()))
+        custom_ids = np.flatnonzero(~np.isnan(self.custom_costs))
+        custom_costs = {self.cost_model.conditions[i]: float(self.custom_costs[i]) for i in custom_ids}
+        custom_conditions = [(cond.name, cond.patients, cond.cost) for cond in self.custom_conditions]
+        return self.calculator.update(patients_per_condition, custom_costs, custom_conditions)
+
+    def monte_carlo_key(self, *settings) -> tuple:
+        """Everything a simulation depends on: cost data, result rows and the simulation settings"""
+        return (self.cost_model.version_label, self.cost_model.COST_COLUMN,
+                tuple(self.calculator.results_df.itertuples(index=False, name=None)), *settings)
+
+    def current_monte_carlo_summary(self, key: tuple):
+        """The stored simulation summary when it was computed for `key`, else None"""
+        return self.monte_carlo_summary if self.monte_carlo_inputs == key else None
+
+    @property
+    def results_df(self):
+        if not self.results_calculated or self.calculator is None:
+            return None
+        return self.calculator.results_df
+
+    @property
+    def total_cost(self) -> float:
+        return self.calculator.total_cost if self.calculator is not None else 0.0
+
+    def memory_report(self) -> dict:
+        """Approximate bytes held per field, plus a 'Total'; the shared cost model is not counted"""
+        report = {}
+        for field in self.__slots__:
+            if field == 'cost_model':
+                continue
+            report[field] = _deep_size(getattr(self, field))
+        report['Total'] = sys.getsizeof(self) + sum(report.values())
+        return report
+
+
+def _deep_size(value) -> int:
+    """Size of a value including what it references, stopping at the shared cost model"""
+    if isinstance(value, HealthcareCostModel):
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        size = sys.getsizeof(value)
+        if value.dtype == object:
+            size += sum(sys.getsizeof(item) for item in value.ravel())
+        return size
+    if isinstance(value, (list, tuple, set, deque)):
+        return sys.getsizeof(value) + sum(_deep_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_deep_size(key) + _deep_size(item) for key, item in value.items())
+    if hasattr(type(value), '__slots__'):
+        return sys.getsizeof(value) + sum(_deep_size(getattr(value, field, None)) for field in type(value).__slots__)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + _deep_size(vars(value))
+    return sys.getsizeof(value)
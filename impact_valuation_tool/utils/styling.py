@@ -1,6 +1,10 @@
 """
 Streamlit UI styling and theme management
 """
+THEMES = ('light', 'dark')
+
+# Stands in for the selected reference year in the precomputed markup
+YEAR_PLACEHOLDER = '%REFERENCE_YEAR%'
 
 
 def get_theme_css(theme: str) -> str:
@@ -191,3 +195,256 @@ def get_sticky_header_style(theme: str) -> tuple[str, str]:
             "background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);",
             "color: #00d4ff;"
         )
+
+
+def _build_page_css(theme: str) -> str:
+    """The <style> block of the page: theme colours plus the layout shared by both themes"""
+    theme_css = get_theme_css(theme)
+    return f"""
+    <style>
+    html, body {{
+        scroll-behavior: smooth;
+    }}
+    
+    {theme_css}
+    
+    /* Sticky header container */
+    .sticky-header {{
+        position: fixed;
+        top: 0;
+        left: 0;
+        right: 0;
+        z-index: 999;
+        padding: 0.5rem 1rem;
+        text-align: center;
+        font-size: 1.2rem;
+        font-weight: 700;
+        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
+        opacity: 0;
+        transform: translateY(-100%);
+        transition: all 0.3s ease;
+        pointer-events: none;
+    }}
+    
+    .sticky-header.visible {{
+        opacity: 1;
+        transform: translateY(0);
+        pointer-events: auto;
+    }}
+    
+    /* Header styling */
+    .main-header {{
+        font-size: 2.8rem;
+        font-weight: 800;
+        text-align: center;
+        margin: 2rem 0 1.5rem 0;
+        letter-spacing: -0.5px;
+    }}
+    
+    .sub-header {{
+        font-size: 1.6rem;
+        font-weight: 700;
+        margin-top: 2.5rem;
+        margin-bottom: 1.5rem;
+        padding-bottom: 0.75rem;
+    }}
+    
+    /* Metric card - improved */
+    .metric-card {{
+        padding: 1.5rem;
+        border-radius: 12px;
+        margin: 0.75rem 0;
+        transition: transform 0.3s ease, box-shadow 0.3s ease;
+    }}
+    
+    .metric-card:hover {{
+        transform: translateY(-2px);
+    }}
+    
+    /* Result highlight */
+    .result-highlight {{
+        padding: 2rem;
+        border-radius: 15px;
+        text-align: center;
+        margin: 2rem 0;
+    }}
+    
+    /* Chart container */
+    .chart-container {{
+        padding: 1.5rem;
+        border-radius: 12px;
+        margin: 1.5rem 0;
+    }}
+    
+    /* Debug/service styling */
+    .debug-condition {{
+        padding: 1rem;
+        margin: 0.75rem 0;
+        border-radius: 8px;
+    }}
+    
+    .debug-service-success {{
+        color: #4caf50;
+        font-weight: 600;
+    }}
+    
+    .debug-service-error {{
+        color: #f44336;
+        font-weight: 600;
+    }}
+    
+    .debug-service-warning {{
+        color: #ff9800;
+        font-weight: 600;
+    }}
+    
+    /* Button styling */
+    .stButton > button {{
+        border: none;
+        padding: 0.6rem 1.5rem;
+        border-radius: 8px;
+        font-weight: 600;
+        transition: all 0.3s ease;
+    }}
+    
+    .stButton > button:hover {{
+        transform: translateY(-2px);
+    }}
+    
+    /* Input styling */
+    .stNumberInput input, .stTextInput input {{
+        border-radius: 8px;
+        border: 2px solid #e0e0e0;
+        padding: 0.75rem;
+        transition: all 0.3s ease;
+    }}
+    
+    .stNumberInput input:focus, .stTextInput input:focus {{
+        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
+    }}
+    
+    /* Expander styling */
+    .streamlit-expanderHeader {{
+        background-color: #f8f9ff;
+        border-radius: 8px;
+    }}
+    
+    .streamlit-expanderHeader:hover {{
+        background-color: #f0f2ff;
+    }}
+    
+    /* Footer styling */
+    .footer {{
+        text-align: center;
+        padding: 2rem;
+        color: #666;
+        border-top: 2px solid #e0e0e0;
+        margin-top: 2rem;
+    }}
+    
+    /* Dataframe styling */
+    .stDataFrame {{
+        border-radius: 8px;
+        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.08);
+    }}
+    
+    /* Smooth scrolling */
+    .stApp {{
+        scroll-behavior: smooth !important;
+    }}
+    
+    /* Info box styling */
+    .stAlert {{
+        border-radius: 8px;
+        border-left: 4px solid;
+    }}
+    </style>
+    """
+
+
+MAIN_HEADER_HTML = '<div class="main-header">💰 Financial Impact Tool for Lifestyle Coaches</div>'
+
+
+def _build_header_html(theme: str) -> tuple[str, str, str]:
+    """Sticky header, page title and welcome box"""
+    sticky_bg, sticky_color = get_sticky_header_style(theme)
+    
+    sticky_html = f"""
+    <div class="sticky-header" id="stickyHeader" style="{sticky_bg} {sticky_color}">
+        💰 Financial Impact Tool for Lifestyle Coaches
+    </div>
+    <script>
+        window.addEventListener('scroll', function() {{
+            var header = document.getElementById('stickyHeader');
+            if (window.pageYOffset > 300) {{
+                header.classList.add('visible');
+            }} else {{
+                header.classList.remove('visible');
+            }}
+        }});
+    </script>
+    """
+
+    if theme == 'light':
+        welcome_bg = "background: linear-gradient(135deg, #667eea15 0%, #764ba215 100%);"
+        welcome_border = "border-left: 5px solid #667eea;"
+        welcome_title_color = "color: #667eea;"
+        welcome_text_color = "color: #333;"
+        welcome_caption_color = "color: #666;"
+    else:
+        welcome_bg = "background: linear-gradient(135deg, #252b42 0%, #1e2235 100%);"
+        welcome_border = "border-left: 5px solid #00d4ff;"
+        welcome_title_color = "color: #00d4ff;"
+        welcome_text_color = "color: #e0e0e0;"
+        welcome_caption_color = "color: #b0b0b0;"
+    
+    welcome_html = f"""
+    <div style="{welcome_bg} padding: 2rem; border-radius: 12px; {welcome_border} margin-bottom: 2rem;">
+        <h3 style="{welcome_title_color} margin-top: 0;">Welcome! 👋</h3>
+        <p style="font-size: 1.05rem; line-height: 1.6; {welcome_text_color}">
+        This interactive tool helps <strong>lifestyle coaches</strong> quantify the potential <strong>societal healthcare cost savings</strong> from their interventions. 
+        By inputting your patient data, you can estimate the costs the healthcare system might incur if patients required full treatment for their conditions.
+        </p>
+        <p style="font-size: 1.05rem; line-height: 1.6; {welcome_text_color}">
+        <strong>📊 Quick Start:</strong><br>
+        1️⃣ Specify how many patients you treat for each health condition<br>
+        2️⃣ Add any custom conditions if needed<br>
+        3️⃣ Click <strong>"Calculate Impact"</strong> to see detailed cost breakdowns<br>
+        4️⃣ Explore scenarios to estimate savings from prevalence reduction
+        </p>
+        <p style="font-size: 0.95rem; {welcome_caption_color} margin-bottom: 0;"><em>💡<strong>Disclaimer:</strong> if no costs are entered, the default costs will be used*. All calculations are based on <a href="https://www.zorgcijfersdatabank.nl/" target="_blank">{YEAR_PLACEHOLDER} Dutch healthcare cost data</a></p></em>
+        <p style="font-size: 0.75rem; {welcome_caption_color} margin-bottom: 0;"><em>*Calculations of costs per condition are estimated and should be used for informational purposes only.
+    </div>
+    """
+    return sticky_html, MAIN_HEADER_HTML, welcome_html
+
+
+_FOOTER_HTML = f"""
+    <div class="footer">
+    <p> Developed with ❤️ for lifestyle coaches | Data based on {YEAR_PLACEHOLDER} healthcare costs</p>
+    <p><em>Results are estimated and should be used for informational purposes only.</em></p>
+    </div>
+    """
+
+# Everything above is assembled once per theme at import; Streamlit re-executes app.py on
+# every rerun, but imported modules stay loaded, so reruns only look the strings up
+_PAGE_CSS = {theme: _build_page_css(theme) for theme in THEMES}
+_HEADER_HTML = {theme: _build_header_html(theme) for theme in THEMES}
+
+
+def _known_theme(theme: str) -> str:
+    return 'light' if theme == 'light' else 'dark'
+
+
+def get_page_css(theme: str) -> str:
+    return _PAGE_CSS[_known_theme(theme)]
+
+
+def get_header_html(theme: str, year: int) -> tuple[str, str, str]:
+    """Markdown blocks of the sticky header, page title and welcome box for the selected reference year"""
+    sticky_html, main_header_html, welcome_html = _HEADER_HTML[_known_theme(theme)]
+    return sticky_html, main_header_html, welcome_html.replace(YEAR_PLACEHOLDER, str(year))
+
+
+def get_footer_html(year: int) -> str:
+    return _FOOTER_HTML.replace(YEAR_PLACEHOLDER, str(year))